@@ -0,0 +1,31 @@
+"""
+Transform & load steps shared by the transform Lambda (src/lambdas/transform_lambda) and the
+rescrape job (src/rescrape).
+
+    raw auctions -> flatten_auctions -> create_auction_df -> extract_invalid_auctions
+                 -> clean_and_transform -> load_to_s3
+
+`transform` holds the pandas steps, `load` writes the cleaned frame to the processed auctions
+bucket. Both read and write S3 objects through `codec` (JSON backends) and `compression` (gzip/zstd
+object bodies). Output changes are caught by `src/rescrape/benchmark_transform.py --check`.
+"""
+from auction_transform.transform import (
+    read_json_from_s3,
+    AUCTION_SCHEMA,
+    flatten_auctions,
+    create_auction_df,
+    extract_invalid_auctions,
+    clean_and_transform,
+)
+from auction_transform.load import (
+    STORAGE_MODES,
+    FILE_FORMATS,
+    S3_MAX_WORKERS,
+    S3_CLIENT_CONFIG,
+    encode_part,
+    read_part_frame,
+    read_day_manifest,
+    resolve_part_keys,
+    load_to_s3,
+    load_to_s3_partitioned,
+)
@@ -0,0 +1,130 @@
+import os
+import json
+
+try:
+    import orjson
+except ImportError:  # stdlib json is used without it
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+# JSON backend for the raw auction files, processed NDJSON day files and manifests:
+# 'auto' (orjson, else msgspec, else stdlib), 'orjson', 'msgspec' or 'stdlib'
+JSON_CODEC = os.getenv('JSON_CODEC', 'auto')
+JSON_CODECS = ('orjson', 'msgspec', 'stdlib')
+
+# the fast backends reject the NaN/Infinity literals stdlib json writes (older merged day files
+# can hold them), documents they can't decode are decoded again with stdlib json
+FAST_DECODE_ERRORS = tuple(
+    error for error in (
+        orjson.JSONDecodeError if orjson else None,
+        msgspec.DecodeError if msgspec else None,
+    ) if error is not None
+)
+# orjson raises TypeError for objects it can't encode (e.g. non-str dict keys)
+FAST_ENCODE_ERRORS = (TypeError, OverflowError) + ((msgspec.EncodeError,) if msgspec else ())
+
+
+def available_codecs() -> list:
+    """The JSON backends that can be used here, fastest first."""
+    return [
+        name for name, module in (('orjson', orjson), ('msgspec', msgspec), ('stdlib', json))
+        if module is not None
+    ]
+
+
+def select_codec(name:str = JSON_CODEC) -> str:
+    """
+    Resolves a JSON_CODEC setting to a backend name.
+
+    Raises:
+        ValueError: If the backend is unknown or isn't installed.
+    """
+    if name == 'auto':
+        return available_codecs()[0]
+    if name not in JSON_CODECS:
+        raise ValueError(f"Unknown JSON codec '{name}', expected 'auto' or one of {JSON_CODECS}")
+    if name not in available_codecs():
+        raise ValueError(f"JSON codec '{name}' is not installed")
+    return name
+
+
+CODEC = select_codec()
+
+if msgspec is not None:
+    MSGSPEC_DECODER = msgspec.json.Decoder()
+    MSGSPEC_ENCODER = msgspec.json.Encoder()
+
+
+def loads(content, codec:str = None):
+    """
+    Decodes a JSON document from bytes (or str), without decoding bytes to str first.
+
+    Parameters:
+        content (bytes | str): The JSON document, e.g. an S3 object body
+        codec (str): Backend to use instead of the JSON_CODEC one
+
+    Returns:
+        dict or list: The decoded document
+    """
+    codec = codec or CODEC
+    try:
+        if codec == 'orjson':
+            return orjson.loads(content)
+        if codec == 'msgspec':
+            return MSGSPEC_DECODER.decode(content)
+    except FAST_DECODE_ERRORS:
+        pass
+    return json.loads(content)
+
+
+def ndjson_lines(content) -> list:
+    """The non-blank lines of an NDJSON document, as bytes."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return [line for line in content.splitlines() if line.strip()]
+
+
+def loads_ndjson(content, codec:str = None) -> list:
+    """
+    Decodes an NDJSON document (one JSON record per line, blank lines ignored) into a list of records.
+
+    msgspec decodes the whole document in one `decode_lines` call; the other backends decode the
+    byte lines one by one (for orjson this is faster than joining them into one JSON array).
+    Lines a fast backend rejects are decoded with stdlib json.
+
+    Parameters:
+        content (bytes | str): The NDJSON document, e.g. an S3 object body
+        codec (str): Backend to use instead of the JSON_CODEC one
+
+    Returns:
+        list: The decoded records
+    """
+    codec = codec or CODEC
+    if codec == 'msgspec':
+        try:
+            return MSGSPEC_DECODER.decode_lines(content)
+        except FAST_DECODE_ERRORS:
+            pass
+    return [loads(line, codec) for line in ndjson_lines(content)]
+
+
+def dumps(obj, codec:str = None) -> bytes:
+    """
+    Encodes an object as compact JSON bytes. numpy arrays and scalars are supported by the orjson
+    backend only; objects a fast backend can't encode are encoded with stdlib json.
+    """
+    codec = codec or CODEC
+    try:
+        if codec == 'orjson':
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+        if codec == 'msgspec':
+            return MSGSPEC_ENCODER.encode(obj)
+    except FAST_ENCODE_ERRORS:
+        pass
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
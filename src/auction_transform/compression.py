@@ -0,0 +1,87 @@
+import os
+import gzip
+
+try:
+    import zstandard
+except ImportError:  # only needed for 'zstd' compressed objects
+    zstandard = None
+
+
+# compression of the NDJSON, JSON and text objects written to S3: 'gzip', 'zstd' or 'none' (the
+# default: objects are stored as before for consumers outside this repo). Objects keep their keys;
+# the compression is recorded in their ContentEncoding, and reads decompress by ContentEncoding or
+# by the body's magic bytes, so objects written with any setting read the same.
+OBJECT_COMPRESSION = os.getenv('OBJECT_COMPRESSION', 'none')
+COMPRESSIONS = ('gzip', 'zstd', 'none')
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# formats compressed internally (parquet pages are zstd), stored as they are
+PRECOMPRESSED_CONTENT_TYPES = ('application/vnd.apache.parquet',)
+
+
+def check_compression(compression:str) -> str:
+    """
+    Raises:
+        ValueError: If the compression is unknown.
+        ImportError: If it is 'zstd' and the zstandard package isn't installed.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown object compression '{compression}', expected one of {COMPRESSIONS}")
+    if compression == 'zstd' and zstandard is None:
+        raise ImportError("zstandard is required for 'zstd' object compression")
+    return compression
+
+
+def compress(body:bytes, compression:str = None) -> tuple:
+    """
+    Compresses an object body.
+
+    Parameters:
+        body (bytes): The uncompressed body
+        compression (str): 'gzip', 'zstd' or 'none', instead of OBJECT_COMPRESSION
+
+    Returns:
+        tuple: (body, ContentEncoding or None if the body is stored uncompressed)
+    """
+    compression = check_compression(compression or OBJECT_COMPRESSION)
+    if compression == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), 'gzip'
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body), 'zstd'
+    return body, None
+
+
+def decompress(body:bytes, content_encoding:str = None) -> bytes:
+    """
+    Decompresses an object body by its ContentEncoding, or by its magic bytes for objects stored
+    without one. Other bodies (uncompressed JSON or text) are returned as they are.
+    """
+    if content_encoding == 'gzip' or body[:2] == GZIP_MAGIC:
+        return gzip.decompress(body)
+    if content_encoding == 'zstd' or body[:4] == ZSTD_MAGIC:
+        if zstandard is None:
+            raise ImportError("zstandard is required to read 'zstd' compressed objects")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    return body
+
+
+def read_body(response:dict) -> bytes:
+    """The decompressed body of an S3 get_object response."""
+    return decompress(response['Body'].read(), response.get('ContentEncoding'))
+
+
+def put_object(s3_client, bucket:str, key:str, body:bytes, content_type:str, compression:str = None, **kwargs):
+    """
+    Uploads an object with its body compressed per `compression` (default OBJECT_COMPRESSION) and a
+    matching ContentEncoding. Formats in PRECOMPRESSED_CONTENT_TYPES are uploaded as they are.
+    Other keyword arguments are passed to put_object (e.g. IfMatch).
+    """
+    if content_type not in PRECOMPRESSED_CONTENT_TYPES:
+        body, content_encoding = compress(body, compression)
+        if content_encoding:
+            kwargs['ContentEncoding'] = content_encoding
+    return s3_client.put_object(Bucket=bucket, Key=key, Body=body, ContentType=content_type, **kwargs)
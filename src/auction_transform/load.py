@@ -0,0 +1,481 @@
+import os
+import io
+import time
+import uuid
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import botocore
+from botocore.config import Config
+import pandas as pd
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for the 'parquet' file format
+    pa = pq = None
+
+from auction_transform import codec, compression
+
+
+STORAGE_MODES = ('merge', 'append')
+FILE_FORMATS = ('ndjson', 'parquet')
+MANIFEST_NAME = '_manifest.json'
+COMPACTION_PART_THRESHOLD = 24
+# attempts to update a day manifest when another writer updated it concurrently
+MANIFEST_WRITE_ATTEMPTS = 5
+# parts younger than this (seconds) are never compacted away: their keys may have just been returned
+# by another writer and not be delivered to the load Lambda yet
+COMPACTION_GRACE_PERIOD = int(os.getenv('COMPACTION_GRACE_PERIOD', 6 * 3600))
+# compacted parts stay resolvable to the part holding their records this long (see `resolve_part_keys`)
+REPLACED_PART_RETENTION = 7 * 86400
+
+# concurrent S3 I/O
+S3_MAX_WORKERS = int(os.getenv('S3_MAX_WORKERS', 8))
+S3_MAX_ATTEMPTS = int(os.getenv('S3_MAX_ATTEMPTS', 4))
+# retries are botocore's standard mode (throttling, 5xx and connection errors, with backoff), per call
+S3_CLIENT_CONFIG = Config(max_pool_connections=S3_MAX_WORKERS, retries={'max_attempts': S3_MAX_ATTEMPTS, 'mode': 'standard'})
+
+# typed columns of the processed auctions parquet files (columns not listed here are not written)
+PARQUET_STRING_COLUMNS = [
+    'auction_url', 'auction_id', 'auction_title', 'auction_subtitle', 'dougs_take', 'ownership_history',
+    'make', 'model', 'vin', 'title_status', 'title_status_cleaned', 'title_state', 'location', 'city', 'state',
+    'seller', 'seller_username', 'buyer_username', 'seller_type', 'engine', 'drivetrain', 'transmission',
+    'transmission_type', 'body_style', 'exterior_color', 'interior_color', 'reserve_status', 'auction_status',
+]
+PARQUET_STRING_LIST_COLUMNS = [
+    'auction_highlights', 'services', 'auction_equipment', 'modifications', 'known_flaws', 'included_items',
+    'seller_notes', 'auction_videos',
+]
+PARQUET_INT_COLUMNS = [
+    'mileage', 'bid_count', 'view_count', 'watcher_count', 'gears', 'manufacture_year', 'highlight_count',
+    'equipment_count', 'mod_count', 'flaw_count', 'service_count', 'included_items_count', 'video_count',
+]
+PARQUET_FLOAT_COLUMNS = ['highest_bid_value', 'max_bid', 'min_bid', 'mean_bid', 'median_bid', 'bid_range']
+
+
+def run_concurrently(fn, items:list, max_workers:int = S3_MAX_WORKERS) -> list:
+    """
+    Runs fn(item) for every item on a bounded thread pool. S3 calls are retried by the client
+    (see S3_CLIENT_CONFIG).
+
+    Results are returned in the same order as `items`. The first error is raised.
+    """
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        return list(executor.map(fn, items))
+
+
+def processed_parquet_schema():
+    """Arrow schema of the processed auctions parquet files."""
+    if pa is None:
+        raise ImportError("pyarrow is required for the 'parquet' file format")
+    return pa.schema(
+        [('auction_date', pa.timestamp('ms', tz='UTC')), ('reserve_met', pa.bool_()), ('bids', pa.list_(pa.int64()))]
+        + [(col, pa.string()) for col in PARQUET_STRING_COLUMNS]
+        + [(col, pa.list_(pa.string())) for col in PARQUET_STRING_LIST_COLUMNS]
+        + [(col, pa.int64()) for col in PARQUET_INT_COLUMNS]
+        + [(col, pa.float64()) for col in PARQUET_FLOAT_COLUMNS]
+    )
+
+
+def to_parquet_bytes(df) -> bytes:
+    """
+    Serializes a cleaned auctions DataFrame to parquet using `processed_parquet_schema`.
+    List columns holding anything other than a list or array (e.g. a plain string) are written as null.
+    """
+    schema = processed_parquet_schema()
+    arrays = []
+    for field in schema:
+        if field.name not in df.columns:
+            arrays.append(pa.nulls(len(df), type=field.type))
+            continue
+        col = df[field.name]
+        if pa.types.is_list(field.type):
+            col = col.where(col.map(type, na_action='ignore').isin([list, np.ndarray]), None)
+        arrays.append(pa.array(col, from_pandas=True).cast(field.type, safe=False) if pa.types.is_timestamp(field.type)
+                      else pa.array(col, type=field.type, from_pandas=True))
+
+    buffer = io.BytesIO()
+    pq.write_table(pa.Table.from_arrays(arrays, schema=schema), buffer, compression='zstd')
+    return buffer.getvalue()
+
+
+def read_parquet_frame(body:bytes):
+    """Reads a processed auctions parquet file into a DataFrame (auction_date as UTC datetime)."""
+    if pq is None:
+        raise ImportError("pyarrow is required for the 'parquet' file format")
+    return pq.read_table(io.BytesIO(body)).to_pandas()
+
+
+def read_part_frame(s3_client, bucket, part_key):
+    """Reads a part file (NDJSON or parquet, by extension) into a DataFrame with a UTC datetime auction_date."""
+    body = compression.read_body(s3_client.get_object(Bucket=bucket, Key=part_key))
+    if part_key.endswith('.parquet'):
+        return read_parquet_frame(body)
+    part_df = pd.DataFrame(codec.loads_ndjson(body))
+    part_df['auction_date'] = pd.to_datetime(part_df['auction_date'], unit='ms', utc=True)
+    return part_df
+
+
+def encode_part(df, file_format:str) -> tuple:
+    """Returns (body, content_type) for a part file in the given format."""
+    if file_format == 'parquet':
+        return to_parquet_bytes(df), 'application/vnd.apache.parquet'
+    return df.to_json(orient='records', lines=True).encode('utf-8'), 'application/json'
+
+
+def merge_ndjson_records(existing_body:bytes, new_body:bytes, new_ids:list, new_dates:list) -> bytes:
+    """
+    Merges new NDJSON records into an existing NDJSON day file at the record level.
+
+    The latest record per auction_id is kept (highest auction_date, new records winning ties) and
+    the records are written newest first. Only auction_id and auction_date are taken from the
+    existing records; kept lines, existing and new, are written back as they are, without being
+    re-encoded.
+
+    Parameters:
+        existing_body (bytes): The current day file
+        new_body (bytes): The new records, one per line
+        new_ids (list): auction_id of every new line, in order
+        new_dates (list): auction_date (epoch ms) of every new line, in order
+
+    Returns:
+        bytes: The merged day file
+    """
+    latest = {}
+    for line in codec.ndjson_lines(existing_body):
+        record = codec.loads(line)
+        auction_date = record.get('auction_date') or 0
+        current = latest.get(record['auction_id'])
+        if current is None or auction_date > current[0]:
+            latest[record['auction_id']] = (auction_date, line)
+
+    for auction_id, auction_date, line in zip(new_ids, new_dates, codec.ndjson_lines(new_body), strict=True):
+        current = latest.get(auction_id)
+        if current is None or auction_date >= current[0]:
+            latest[auction_id] = (auction_date, line)
+
+    merged = sorted(latest.values(), key=lambda item: item[0], reverse=True)
+    return b'\n'.join(line for _, line in merged)
+
+
+def day_prefix(auction_day) -> str:
+    """Returns the S3 prefix of an auction day partition, e.g. 'date=2024-01-05/'."""
+    return f'date={auction_day}/'
+
+
+def read_day_manifest(s3_client, bucket, auction_day) -> tuple:
+    """
+    Reads the manifest of an auction day partition.
+
+    The manifest lists the day's live part files and maps every auction_id to the part holding
+    its current record and that record's auction_date (epoch ms):
+        {"parts": ["date=.../part-....ndjson"], "auctions": {"<auction_id>": ["<part key>", <auction_date>]},
+         "replaced": {"<compacted part key>": "<part key holding its records now>"}}
+
+    Returns:
+        tuple: (manifest, ETag of the manifest object or None if the day has not been written yet)
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=f'{day_prefix(auction_day)}{MANIFEST_NAME}')
+    except botocore.exceptions.ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return {'parts': [], 'auctions': {}}, None
+        raise
+    return codec.loads(compression.read_body(response)), response['ETag']
+
+
+def write_day_manifest(s3_client, bucket, auction_day, manifest:dict, etag:str | None) -> bool:
+    """
+    Writes the manifest only if nobody else wrote it since it was read (conditional put on the ETag).
+
+    Returns:
+        bool: False if the manifest changed in the meantime and the update must be redone
+    """
+    condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+    try:
+        compression.put_object(
+            s3_client, bucket, f'{day_prefix(auction_day)}{MANIFEST_NAME}', codec.dumps(manifest), 'application/json',
+            **condition
+        )
+    except botocore.exceptions.ClientError as e:
+        if e.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict'):
+            return False
+        raise
+    return True
+
+
+def new_part_key(auction_day, file_format:str = 'ndjson') -> str:
+    timestamp = int(datetime.now(timezone.utc).timestamp() * 1000)
+    return f'{day_prefix(auction_day)}part-{timestamp}-{uuid.uuid4().hex[:8]}.{file_format}'
+
+
+def part_written_at(part_key:str) -> float:
+    """The time (epoch s) a part was written, from the timestamp in its key (see `new_part_key`)."""
+    return int(part_key.rsplit('/', 1)[-1].split('-')[1]) / 1000
+
+
+def delete_parts(s3_client, bucket, part_keys:list):
+    for i in range(0, len(part_keys), 1000):
+        s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in part_keys[i:i + 1000]], 'Quiet': True}
+        )
+
+
+def compact_day_partition(s3_client, bucket, auction_day, manifest:dict, file_format:str = 'ndjson',
+                          grace_period:int = COMPACTION_GRACE_PERIOD) -> tuple:
+    """
+    Rewrites the live part files of a day that are older than `grace_period` seconds into a single
+    part, keeping only the record each auction_id currently points to in the manifest. Younger
+    parts stay as they are.
+
+    Parts may be a mix of NDJSON and parquet; the compacted part is written in `file_format`.
+    Neither the manifest nor the old parts are touched on S3: the caller writes the returned
+    manifest and deletes the old parts once that write succeeded.
+
+    Returns:
+        tuple: (updated manifest, compacted part key, old part keys); the manifest as it is with
+        (None, []) if fewer than two parts are old enough to compact
+    """
+    now = time.time()
+    old_parts = [part_key for part_key in manifest['parts'] if now - part_written_at(part_key) >= grace_period]
+    if len(old_parts) < 2:
+        return manifest, None, []
+
+    current_frames = []
+    for part_key in old_parts:
+        part_df = read_part_frame(s3_client, bucket, part_key)
+        is_current = part_df['auction_id'].map(lambda auction_id: manifest['auctions'].get(auction_id, [None])[0]).eq(part_key)
+        current_frames.append(part_df.loc[is_current])
+
+    compacted_df = pd.concat(current_frames, ignore_index=True).sort_values('auction_date', ascending=False)
+    compacted_key = new_part_key(auction_day, file_format)
+    body, content_type = encode_part(compacted_df, file_format)
+    compression.put_object(s3_client, bucket, compacted_key, body, content_type)
+
+    # parts compacted before into one of the old parts now resolve to the new compacted part
+    compacted = set(old_parts)
+    replaced = {
+        part_key: compacted_key if replaced_by in compacted else replaced_by
+        for part_key, replaced_by in manifest.get('replaced', {}).items()
+        if now - part_written_at(part_key) < REPLACED_PART_RETENTION
+    }
+    replaced.update({part_key: compacted_key for part_key in old_parts})
+    manifest = {
+        'parts': [part_key for part_key in manifest['parts'] if part_key not in compacted] + [compacted_key],
+        'auctions': {
+            auction_id: [compacted_key if part_key in compacted else part_key, auction_date]
+            for auction_id, (part_key, auction_date) in manifest['auctions'].items()
+        },
+        'replaced': replaced,
+    }
+    return manifest, compacted_key, old_parts
+
+
+def resolve_part_keys(s3_client, bucket, keys:list) -> list:
+    """
+    Maps part keys that were compacted away after they were written (e.g. by a later batch of the
+    same run) to the part holding their records now, using the `replaced` mapping of the day
+    manifests. Other keys (e.g. merge mode day files) are returned as they are.
+
+    Returns:
+        list: The keys to hand to the load Lambda, without duplicates
+    """
+    manifests = {}
+    resolved_keys = []
+    for key in keys:
+        day_dir, _, name = key.rpartition('/')
+        if not day_dir.startswith('date=') or not name.startswith('part-'):
+            resolved_keys.append(key)
+            continue
+        if day_dir not in manifests:
+            manifests[day_dir] = read_day_manifest(s3_client, bucket, day_dir[len('date='):])[0]
+        resolved_keys.append(manifests[day_dir].get('replaced', {}).get(key, key))
+    return list(dict.fromkeys(resolved_keys))
+
+
+def load_to_s3_partitioned(s3_client, bucket, df, file_format:str = 'ndjson',
+                           compaction_threshold:int = COMPACTION_PART_THRESHOLD, max_workers:int = S3_MAX_WORKERS) -> list:
+    """
+    Appends a cleaned DataFrame to an S3 bucket as immutable part files, one or more per auction day
+    (`date=YYYY-MM-DD/part-*.ndjson` or `part-*.parquet`).
+
+    Unlike the merge mode of `load_to_s3`, existing day data is never downloaded. For each day:
+      - The day manifest (auction_id -> part, auction_date) is read.
+      - Records whose auction_id is already stored with a later auction_date are skipped. A record
+        with the same auction_date replaces the stored one (e.g. a rescrape with updated bids), as
+        new records win ties in merge mode.
+      - If the day already has `compaction_threshold` or more parts, the ones older than
+        COMPACTION_GRACE_PERIOD are compacted first.
+      - The remaining records are written as a new part and the manifest is updated to point to it.
+
+    The manifest is written with a conditional put, so concurrent writers to the same day don't
+    lose each other's entries: if it changed since it was read, the parts written for it are
+    deleted and the day is loaded again against the new manifest (up to MANIFEST_WRITE_ATTEMPTS
+    times). Compacted parts are deleted only after the manifest stopped pointing to them.
+
+    Parameters:
+        s3_client : boto3.client
+        bucket (str): The name of the target S3 bucket.
+        df (pd.DataFrame): The cleaned DataFrame containing an 'auction_date' column in datetime format.
+        file_format (str): 'ndjson' or 'parquet'.
+        compaction_threshold (int): Number of parts a day may accumulate before it is compacted.
+        max_workers (int): Number of days written concurrently.
+
+    Returns:
+        - a list of uploaded part keys (new records only)
+    """
+    def load_day(day_group):
+        auction_day, day_df = day_group
+        day_df = day_df.drop(columns=['auction_saving_date'])
+        day_df = day_df.sort_values('auction_date', ascending=False).drop_duplicates('auction_id', keep='first')
+        day_dates = day_df['auction_date'].dt.as_unit('ms').astype('int64')
+
+        for _ in range(MANIFEST_WRITE_ATTEMPTS):
+            manifest, etag = read_day_manifest(s3_client, bucket, auction_day)
+            is_new = [
+                auction_id not in manifest['auctions'] or manifest['auctions'][auction_id][1] <= auction_date
+                for auction_id, auction_date in zip(day_df['auction_id'], day_dates)
+            ]
+            group, auction_dates = day_df.loc[is_new], day_dates.loc[is_new]
+            if group.empty:
+                print(f"No new auctions for {auction_day}, skipping")
+                return None
+
+            written_parts, old_parts = [], []
+            if len(manifest['parts']) >= compaction_threshold:
+                try:
+                    manifest, compacted_key, old_parts = compact_day_partition(
+                        s3_client, bucket, auction_day, manifest, file_format
+                    )
+                except botocore.exceptions.ClientError as e:
+                    if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+                        raise
+                    # another writer compacted the day in the meantime, read its manifest again
+                    continue
+                if compacted_key:
+                    written_parts.append(compacted_key)
+
+            part_key = new_part_key(auction_day, file_format)
+            body, content_type = encode_part(group, file_format)
+            compression.put_object(s3_client, bucket, part_key, body, content_type)
+            written_parts.append(part_key)
+
+            manifest['parts'].append(part_key)
+            for auction_id, auction_date in zip(group['auction_id'], auction_dates.tolist()):
+                manifest['auctions'][auction_id] = [part_key, auction_date]
+
+            if write_day_manifest(s3_client, bucket, auction_day, manifest, etag):
+                if old_parts:
+                    delete_parts(s3_client, bucket, old_parts)
+                    print(f"Compacted {len(old_parts)} parts of {auction_day} into {written_parts[0]}")
+                return part_key
+
+            # the manifest changed since it was read: nothing points to the parts written for it
+            print(f"Manifest of {auction_day} changed concurrently, loading the day again")
+            delete_parts(s3_client, bucket, written_parts)
+
+        raise RuntimeError(f"Manifest of {auction_day} kept changing, giving up")
+
+    df['auction_saving_date'] = df['auction_date'].dt.date
+    uploaded_objects = run_concurrently(load_day, list(df.groupby('auction_saving_date')), max_workers)
+    return [key for key in uploaded_objects if key is not None]
+
+def load_to_s3(s3_client, bucket, df, storage_mode:str = 'merge', file_format:str = 'ndjson',
+               max_workers:int = S3_MAX_WORKERS)->list:
+    """
+    Uploads a cleaned DataFrame to an S3 bucket in NDJSON format, grouped by auction date.
+
+    This function groups the input DataFrame by the `auction_date` column (date-only),
+    and for each group:
+      - Encodes the group as NDJSON bytes in one pass.
+      - Checks if a corresponding object (file) already exists in the S3 bucket.
+        - If it exists: merges the new records into the existing ones, keeping the latest record per
+          auction_id (see `merge_ndjson_records`), and writes the merged data back to S3.
+        - If it does not exist: uploads the new group data directly.
+      - NDJSON day files are compressed as set by OBJECT_COMPRESSION (see `compression.put_object`).
+    
+    Parameters:
+    -----------
+    s3_client : boto3.client
+        A Boto3 S3 client instance.
+    
+    bucket : str
+        The name of the target S3 bucket.
+
+    df : pandas.DataFrame
+        The cleaned DataFrame containing an 'auction_date' column in datetime format.
+        The function creates a temporary column 'auction_saving_date' (date-only) to group the data.
+
+    storage_mode : str
+        'merge' (default) rewrites one `{date}.json` file per day as described above.
+        'append' writes immutable part files under a day prefix instead (see `load_to_s3_partitioned`).
+
+    file_format : str
+        'ndjson' (default) or 'parquet'. Parquet day files are written as `{date}.parquet` with the
+        typed columns of `processed_parquet_schema` (bids as list<int64>).
+
+    max_workers : int
+        Number of auction days uploaded concurrently (see `run_concurrently`).
+    
+    Returns:
+        - a list of uploaded objects keys
+    """
+    if storage_mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown storage_mode '{storage_mode}', expected one of {STORAGE_MODES}")
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unknown file_format '{file_format}', expected one of {FILE_FORMATS}")
+    if storage_mode == 'append':
+        return load_to_s3_partitioned(s3_client, bucket, df, file_format, max_workers=max_workers)
+
+    def check_object_exists(bucket,object_key):
+        try:
+            response = s3_client.head_object(Bucket=bucket, Key=object_key)
+            return True
+        except botocore.exceptions.ClientError as e:
+            return False
+        
+
+    def load_day(day_group):
+        auction_day, group = day_group
+        if file_format == 'parquet':
+            group_object_key = f'{auction_day}.parquet'
+            group = group.drop(columns=['auction_saving_date'])
+
+            # merge with the existing day file, keeping the latest record per auction_id
+            if check_object_exists(bucket, group_object_key):
+                response = s3_client.get_object(Bucket=bucket, Key=group_object_key)
+                existing_df = read_parquet_frame(compression.read_body(response))
+                group = pd.concat([existing_df, group], ignore_index=True)
+                group = group.sort_values('auction_date', ascending=False).drop_duplicates('auction_id', keep='first')
+
+            s3_client.put_object(Bucket=bucket, Key=group_object_key, Body=to_parquet_bytes(group), ContentType='application/vnd.apache.parquet')
+            return group_object_key
+
+        # create object key
+        group_object_key = f'{auction_day}.json'
+
+        # encode the group to NDJSON in one pass
+        group = group.drop(columns=['auction_saving_date'])
+        body, content_type = encode_part(group, 'ndjson')
+
+        # check if key exists in bucket
+        if check_object_exists(bucket, group_object_key):
+            response = s3_client.get_object(Bucket=bucket, Key=group_object_key)
+            body = merge_ndjson_records(
+                compression.read_body(response),
+                body,
+                group['auction_id'].tolist(),
+                group['auction_date'].dt.as_unit('ms').astype('int64').tolist()
+            )
+
+        compression.put_object(s3_client, bucket, group_object_key, body, content_type)
+        return group_object_key
+
+    # group the df by auction_saving_date and upload the days concurrently
+    df['auction_saving_date'] = df['auction_date'].dt.date
+    return run_concurrently(load_day, list(df.groupby('auction_saving_date')), max_workers)
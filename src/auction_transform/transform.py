@@ -0,0 +1,478 @@
+import re
+import itertools
+
+import pandas as pd
+import numpy as np
+
+from auction_transform import codec, compression
+
+
+def read_json_from_s3(s3_client, bucket: str, key: str) -> dict:
+    """
+    Read a JSON file from S3.
+
+    Args:
+        s3_client : boto3.client
+        bucket (str): Name of the S3 bucket.
+        key (str): Object key (path to file in S3).
+
+    Returns:
+        dict: Parsed JSON data from the file.
+
+    Raises:
+        Exception: If the file cannot be retrieved or parsed.
+    """
+    print(f"Reading file from s3://{bucket}/{key}")
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+        return codec.loads(compression.read_body(response))
+    except Exception as e:
+        print(f"Error reading file from S3: {e}")
+        raise
+
+# raw auction -> DataFrame schema. Every column is always present, in this order, with this dtype;
+# list columns hold python lists. Integer columns are nullable ('Int64'): a missing value stays <NA>
+# instead of turning the whole column into floats.
+AUCTION_SCHEMA = [
+    ('auction_url', object),
+    ('auction_title', object),
+    ('auction_subtitle', object),
+    ('dougs_take', object),
+    ('auction_highlights', object),
+    ('services', object),
+    ('auction_equipment', object),
+    ('modifications', object),
+    ('known_flaws', object),
+    ('included_items', object),
+    ('ownership_history', object),
+    ('seller_notes', object),
+    ('auction_videos', object),
+    # auction_quick_facts
+    ('make', object),
+    ('model', object),
+    ('mileage', object),
+    ('vin', object),
+    ('title_status', object),
+    ('location', object),
+    ('seller', object),
+    ('engine', object),
+    ('drivetrain', object),
+    ('transmission', object),
+    ('body_style', object),
+    ('exterior_color', object),
+    ('interior_color', object),
+    ('seller_type', object),
+    # auction_stats
+    ('reserve_status', object),
+    ('auction_status', object),
+    ('highest_bid_value', object),
+    ('buyer_username', object),
+    ('seller_username', object),
+    ('bid_count', 'Int64'),
+    ('view_count', 'Int64'),
+    ('watcher_count', 'Int64'),
+    ('auction_date', object),
+    ('bids', object),
+]
+AUCTION_DTYPES = dict(AUCTION_SCHEMA)
+
+# raw auction_quick_facts keys -> columns
+QUICK_FACT_COLUMNS = {
+    'Make': 'make',
+    'Model': 'model',
+    'Mileage': 'mileage',
+    'VIN': 'vin',
+    'Title Status': 'title_status',
+    'Location': 'location',
+    'Seller': 'seller',
+    'Engine': 'engine',
+    'Drivetrain': 'drivetrain',
+    'Transmission': 'transmission',
+    'Body Style': 'body_style',
+    'Exterior Color': 'exterior_color',
+    'Interior Color': 'interior_color',
+    'Seller Type': 'seller_type',
+}
+
+# auction_stats keys (same as their columns)
+STATS_COLUMNS = (
+    'reserve_status', 'auction_status', 'highest_bid_value', 'buyer_username', 'seller_username',
+    'bid_count', 'view_count', 'watcher_count', 'auction_date', 'bids',
+)
+
+# stats that default to 0 when an auction doesn't have them at all
+ZERO_DEFAULT_STATS = ('view_count', 'watcher_count')
+
+
+def column_name(raw_key:str) -> str:
+    """Column for a raw key outside the schema, e.g. 'Title Status' -> 'title_status'."""
+    return raw_key.lower().replace(" ", "_")
+
+
+def flatten_auctions(data) -> dict:
+    """
+    Flattens nested auction data into columns in a single pass.
+
+    Values are written straight into one preallocated list per `AUCTION_SCHEMA` column (None where an
+    auction has no value). Quick facts and stats keys outside the schema, e.g. from old raw files, are
+    kept as extra object columns named with `column_name`.
+
+    Args:
+        data: Input auction data (dict or list format)
+            - If dict: {url: {auction_data}}
+            - If list: [{auction_data}]
+
+    Returns:
+        dict: {column: list} for `create_auction_df`
+    """
+    if isinstance(data, dict):
+        auctions = list(data.items())
+    elif isinstance(data, list):
+        auctions = [(None, auction) for auction in data]
+    else:
+        raise ValueError("Input must be dictionary or list")
+
+    n_auctions = len(auctions)
+    columns = {column: [None] * n_auctions for column, _ in AUCTION_SCHEMA}
+
+    # raw key -> the column list it is written to
+    quick_fact_targets = {key: columns[column] for key, column in QUICK_FACT_COLUMNS.items()}
+    stats_targets = {key: columns[key] for key in STATS_COLUMNS}
+
+    def extra_column(key):
+        column = column_name(key)
+        if column not in columns:
+            columns[column] = [None] * n_auctions
+        return columns[column]
+
+    def list_field(field_data, list_key):
+        """Extracts list from field data with flexible key handling"""
+        if isinstance(field_data, list):
+            return field_data
+        if isinstance(field_data, dict):
+            return field_data.get(list_key, [])
+        return []
+
+    auction_url = columns['auction_url']
+    auction_title = columns['auction_title']
+    auction_subtitle = columns['auction_subtitle']
+    dougs_take = columns['dougs_take']
+    auction_highlights = columns['auction_highlights']
+    services = columns['services']
+    auction_equipment = columns['auction_equipment']
+    modifications = columns['modifications']
+    known_flaws = columns['known_flaws']
+    included_items = columns['included_items']
+    ownership_history = columns['ownership_history']
+    seller_notes = columns['seller_notes']
+    auction_videos = columns['auction_videos']
+
+    for i, (url, auction) in enumerate(auctions):
+        auction_url[i] = url if url else auction.get('auction_url')
+        auction_title[i] = auction.get('auction_title')
+        auction_subtitle[i] = auction.get('auction_subtitle')
+        dougs_take[i] = auction.get('dougs_take')
+        auction_highlights[i] = list_field(auction.get('auction_highlights'), 'bullet_points')
+        services[i] = list_field(auction.get('services') or auction.get('service_history'), 'items')
+        auction_equipment[i] = auction.get('auction_equipment')
+        modifications[i] = auction.get('modifications')
+        known_flaws[i] = auction.get('known_flaws')
+        included_items[i] = auction.get('included_items')
+        ownership_history[i] = auction.get('ownership_history')
+        seller_notes[i] = auction.get('seller_notes')
+        auction_videos[i] = auction.get('auction_videos', [])
+
+        for key, value in (auction.get('auction_quick_facts') or {}).items():
+            target = quick_fact_targets.get(key)
+            if target is None:
+                target = extra_column(key)
+            target[i] = value
+
+        # stats come last: a stat overrides a quick fact of the same name
+        auction_stats = auction.get('auction_stats') or {}
+        for key, value in auction_stats.items():
+            target = stats_targets.get(key)
+            if target is None:
+                target = extra_column(key)
+            target[i] = value
+        for key in ZERO_DEFAULT_STATS:
+            if key not in auction_stats:
+                columns[key][i] = 0
+
+    return columns
+
+
+def create_auction_df(columns:dict):
+    """
+    Builds the auctions DataFrame once from `flatten_auctions` columns, with the `AUCTION_SCHEMA`
+    dtypes (extra columns stay object). An integer column that holds other values (e.g. '1,234'
+    view counts in old raw files) is kept as object and parsed by `clean_and_transform`.
+
+    Object columns are copied into object arrays as they are, so pandas never infers their dtype
+    (nor turns lists of equal length into 2-D arrays).
+    """
+    frame_columns = {}
+    for column, values in columns.items():
+        dtype = AUCTION_DTYPES.get(column, object)
+        if dtype is not object:
+            try:
+                frame_columns[column] = pd.array(values, dtype=dtype)
+                continue
+            except (TypeError, ValueError):
+                pass
+        frame_columns[column] = np.fromiter(values, dtype=object, count=len(values))
+    return pd.DataFrame(frame_columns, copy=False)
+
+def extract_invalid_auctions(df):
+    """
+    Identifies auctions with invalid auction_status values by checking for key phrases.
+    Removes them from the DataFrame and returns their URLs for re-scraping.
+    
+    Parameters:
+        df (pd.DataFrame): The auction DataFrame.
+    
+    Returns:
+        tuple: (cleaned DataFrame, list of auction URLs with invalid statuses)
+    """
+    # Find auctions with valid auction status
+    valid_status_mask = (
+        df['auction_status'].str.lower().str.contains('sold|reserve not met|canceled|cancelled', na=False)
+    )
+    
+    # Get URLs of invalid auctions
+    rescrape_urls = df.loc[~valid_status_mask, 'auction_url'].tolist()
+    
+    # Keep only valid auctions
+    clean_auctions_df = df.loc[valid_status_mask].copy()
+    
+    return clean_auctions_df, rescrape_urls
+
+
+
+MILEAGE_PATTERN = re.compile(r'([\d,]+)')
+TITLE_STATUS_PATTERN = re.compile(r'^(.*?) \(')
+TITLE_STATE_PATTERN = re.compile(r'\((.*?)\)')
+GEARS_PATTERN = re.compile(r'(\d+)-speed')
+YEAR_PATTERN = re.compile(r'\d+')
+BID_PATTERN = re.compile(r'[+-]?\d+')
+
+
+def count_list_items(series):
+    """
+    Vectorized list length. Returns the length of list values and NaN for anything else
+    (None, NaN, strings, dicts), matching `len(x) if isinstance(x, list) else None`.
+    """
+    lengths = series.str.len()
+    is_list = series.map(type, na_action='ignore').eq(list)
+    if is_list.all():
+        return lengths
+    if not is_list.any():
+        return pd.Series([None] * len(series), index=series.index, dtype=object)
+    return lengths.where(is_list)
+
+
+def compute_bid_features(bids):
+    """
+    Cleans bid lists and computes per-auction bid statistics in one batched pass.
+
+    All bids are flattened into one contiguous int64 array with an offsets array marking where
+    each auction's bids start, and max/min/mean/median/range are computed with segmented
+    reductions instead of building a pd.Series per auction.
+
+    Bid strings are parsed as ints after stripping '$' and ','. An auction whose bids are not a
+    list, or contain any unparsable or non-string bid, gets an empty bid list. Auctions with fewer than
+    two bids get NaN features.
+
+    Parameters:
+        bids (pd.Series): Raw bid lists (e.g. ['$12,000', '13500']).
+
+    Returns:
+        tuple: (pd.Series of cleaned int bid lists, pd.DataFrame with max_bid, min_bid,
+        mean_bid, median_bid and bid_range), both indexed like `bids`.
+    """
+    feature_columns = ['max_bid', 'min_bid', 'mean_bid', 'median_bid', 'bid_range']
+    n_auctions = len(bids)
+    lengths = count_list_items(bids).fillna(0).to_numpy(dtype=np.int64)
+
+    # flatten all bids into one array, tagging each bid with its auction's row position
+    flat_bids = pd.Series(
+        list(itertools.chain.from_iterable(bids.to_numpy(dtype=object)[lengths > 0])),
+        dtype=object,
+    )
+    bid_rows = np.repeat(np.arange(n_auctions), lengths)
+
+    # parse bid strings; an auction with any bad bid is cleaned to an empty list. Non-string bids
+    # (ints, None) are bad bids, and blanked first: .str raises when no bid at all is a string
+    is_string = np.fromiter((isinstance(bid, str) for bid in flat_bids), dtype=bool, count=len(flat_bids))
+    flat_bids = flat_bids.where(is_string, '')
+    flat_bids = flat_bids.str.replace('$', '', regex=False).str.replace(',', '', regex=False).str.strip()
+    parsed = flat_bids.str.fullmatch(BID_PATTERN, na=False).to_numpy()
+    invalid_rows = np.zeros(n_auctions, dtype=bool)
+    invalid_rows[bid_rows[~parsed]] = True
+    keep = ~invalid_rows[bid_rows]
+    values = flat_bids.to_numpy(dtype=object)[keep].astype(str).astype(np.int64)
+    bid_rows = bid_rows[keep]
+    lengths[invalid_rows] = 0
+
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    values_list = values.tolist()
+    clean_bids = pd.Series(
+        [values_list[start:end] for start, end in zip(offsets[:-1], offsets[1:])],
+        index=bids.index,
+        dtype=object,
+    )
+
+    # segmented reductions over auctions with at least two bids
+    features = np.full((n_auctions, len(feature_columns)), np.nan)
+    has_features = lengths >= 2
+    if has_features.any():
+        segment_values = values[has_features[bid_rows]]
+        segment_lengths = lengths[has_features]
+        segment_starts = np.concatenate(([0], np.cumsum(segment_lengths)[:-1]))
+        segment_ids = np.repeat(np.arange(len(segment_lengths)), segment_lengths)
+
+        max_bid = np.maximum.reduceat(segment_values, segment_starts)
+        min_bid = np.minimum.reduceat(segment_values, segment_starts)
+        mean_bid = np.add.reduceat(segment_values, segment_starts) / segment_lengths
+
+        sorted_values = segment_values[np.lexsort((segment_values, segment_ids))].astype(np.float64)
+        lower_mid = sorted_values[segment_starts + (segment_lengths - 1) // 2]
+        upper_mid = sorted_values[segment_starts + segment_lengths // 2]
+        median_bid = (lower_mid + upper_mid) / 2
+
+        features[has_features] = np.column_stack(
+            [max_bid, min_bid, mean_bid, median_bid, max_bid - min_bid]
+        )
+
+    features_df = pd.DataFrame(features, index=bids.index, columns=feature_columns)
+    return clean_bids, features_df
+
+
+def clean_and_transform(df):
+    """
+    Cleans and enriches the valid auctions DataFrame.
+
+    All column cleaning is done with vectorized `.str` accessors, compiled regexes and `np.select`
+    instead of row-wise `Series.apply` callbacks.
+
+    Parameters:
+        df (pd.DataFrame): Valid auctions DataFrame (see `extract_invalid_auctions`).
+
+    Returns:
+        pd.DataFrame: Cleaned DataFrame with derived columns, sorted by auction_date (desc)
+        and deduplicated on auction_id.
+    """
+
+    # Convert 'auction_date' to datetime
+    df['auction_date'] = pd.to_datetime(df['auction_date'],utc=True)
+    df = df.sort_values('auction_date', ascending=False).reset_index(drop=True)
+
+    # extract auction id
+    url_parts = df['auction_url'].str.strip().str.split('/')
+    df['auction_id'] = url_parts.str[4]
+
+
+    # drop duplicates based on auction id
+    df = df.drop_duplicates('auction_id', keep='first')
+    url_parts = url_parts.loc[df.index]
+
+    # clean 'model'
+    df['model'] = df['model'].str.split('\n').str[0].str.strip()
+
+
+    # Convert 'mileage' to integer
+    mileage = df['mileage'].str.extract(MILEAGE_PATTERN, expand=False).str.replace(',', '', regex=False)
+    df['mileage'] = pd.to_numeric(mileage)
+
+
+    # convert 'highest-bid_value' to float
+    df['highest_bid_value'] = df['highest_bid_value'].str.replace('$','').str.replace(',','').astype(float)
+
+    # Convert 'bid_count' to integer
+    df['bid_count'] = pd.to_numeric(df['bid_count'], errors='coerce')
+
+    # Convert 'view_count' to integer
+    df['view_count'] = df['view_count'].astype(str).str.replace(',', '', regex=False)
+    df['view_count'] = pd.to_numeric(df['view_count'], errors='coerce').fillna(0).astype(int)
+
+    # Convert 'watcher_count' to integer
+    df['watcher_count'] = df['watcher_count'].astype('str').replace(',','', regex=True)
+    df['watcher_count'] = pd.to_numeric(df['watcher_count'], errors="coerce").fillna(0).astype(int)
+
+    # clean 'auction status' - change 'sold to' to 'sold'
+    df['auction_status'] = df['auction_status'].str.replace('Sold to','Sold').replace('Reserve not met, bid to', 'Reserve not met')    
+    
+    # Create boolean col for reserve status
+    df['reserve_met'] = df['auction_status'].str.lower().eq('sold')
+
+    # remove 'follow' from seller
+    df['seller'] = df['seller'].str.split('\n').str[0].str.strip()
+
+    # clean bids and compute bid features in one batched pass
+    df['bids'], bid_features_df = compute_bid_features(df['bids'])
+
+
+    # Split 'title_status' into 'title_status_clean' and 'title_state'
+    df['title_status_cleaned'] = df['title_status'].str.extract(TITLE_STATUS_PATTERN)
+    df['title_state'] = df['title_status'].str.extract(TITLE_STATE_PATTERN)
+
+
+    # Split 'location' into 'city' and 'state'
+    location_parts = df['location'].str.rsplit(',', n=1)
+    city = location_parts.str[0].str.strip()
+    state = location_parts.str[1].str.strip().str.split(' ').str[0]
+    df['city'] = city.astype(object).where(city.notna(), None)
+    df['state'] = state.astype(object).where(state.notna(), None)
+
+
+    # clean transmission
+    transmission = df['transmission'].str.lower()
+    has_transmission = transmission.str.len().gt(0)
+    df['transmission_type'] = np.select(
+        [
+            ~has_transmission,
+            transmission.str.contains('manual', regex=False, na=False),
+            transmission.str.contains('auto', regex=False, na=False),
+        ],
+        [None, 'Manual', 'Automatic'],
+        default='Other',
+    )
+    df['transmission_type'] = df['transmission_type'].astype('object') 
+    df['gears'] = pd.to_numeric(transmission.str.extract(GEARS_PATTERN, expand=False))
+
+    # clean drivetrain
+    drivetrain = df['drivetrain'].str.lower()
+
+    def drivetrain_contains(pattern):
+        return drivetrain.str.contains(pattern, regex=False, na=False)
+
+    df['drivetrain'] = np.select(
+        [
+            drivetrain_contains('4wd') & drivetrain_contains('awd'),
+            drivetrain_contains('front'),
+            drivetrain_contains('rear'),
+            drivetrain_contains('awd') | drivetrain_contains('all-wheel'),
+            drivetrain_contains('4wd') | drivetrain_contains('four-wheel'),
+        ],
+        ['4WD/AWD', 'FWD', 'RWD', 'AWD', '4WD'],
+        default='Other',
+    ).astype(object)
+
+    # add bids features
+    df = df.join(bid_features_df)
+
+    # add count fields for auction flaws, services, equipment, extra items, highlights,
+    df['highlight_count'] = count_list_items(df['auction_highlights'])
+    df['equipment_count'] = count_list_items(df['auction_equipment'])
+    df['mod_count'] = count_list_items(df['modifications'])
+    df['flaw_count'] = count_list_items(df['known_flaws'])
+    df['service_count'] = count_list_items(df['services'])
+    df['included_items_count'] = count_list_items(df['included_items'])
+    df['video_count'] = count_list_items(df['auction_videos'])
+
+    
+    # extract manufacture year (leading digits of the url slug, e.g. '2002-bmw-330i-sedan')
+    year = url_parts.str[-1].str.split('-').str[0]
+    df['manufacture_year'] = pd.to_numeric(year.where(year.str.fullmatch(YEAR_PATTERN, na=False)))
+
+    return df
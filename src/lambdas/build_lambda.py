@@ -0,0 +1,120 @@
+"""
+Builds the deployment packages of a Lambda function:
+
+- dist/<function>.zip: the function's directory (main.py, SQL files, migrations) and the shared
+  packages under src/ it imports (src/auction_transform for transform_lambda), which aren't on PyPI
+- dist/<function>-layer.zip: its requirements.txt installed for the Lambda runtime, as a layer
+
+    python src/lambdas/build_lambda.py transform_lambda
+    python src/lambdas/build_lambda.py transform_lambda load_lambda --arch arm64 --output dist
+
+Publish the layer with `aws lambda publish-layer-version --layer-name transform-lambda-deps
+--zip-file fileb://dist/transform_lambda-layer.zip` (through S3 above 50 MB), attach it to the
+function and upload the code with `aws lambda update-function-code --zip-file fileb://dist/transform_lambda.zip`.
+"""
+import os
+import re
+import sys
+import shutil
+import zipfile
+import argparse
+import tempfile
+import subprocess
+
+LAMBDAS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(LAMBDAS_DIR)
+
+# packages under src/ that functions import and that are copied into their build
+SHARED_PACKAGES = ('auction_transform',)
+# Lambda runtime the requirements are installed for
+PYTHON_VERSION = '3.13'
+PLATFORMS = {'x86_64': 'manylinux2014_x86_64', 'arm64': 'manylinux2014_aarch64'}
+EXCLUDED_FILES = ('requirements.txt',)
+EXCLUDED_DIRS = ('__pycache__',)
+
+
+def imported_shared_packages(function_dir:str) -> list:
+    """The SHARED_PACKAGES imported by the function's main.py."""
+    with open(os.path.join(function_dir, 'main.py'), "r", encoding="utf-8") as f:
+        source = f.read()
+    return [
+        package for package in SHARED_PACKAGES
+        if re.search(rf'^\s*(from|import)\s+{package}\b', source, re.MULTILINE)
+    ]
+
+
+def install_requirements(requirements_path:str, target_dir:str, arch:str):
+    """Installs a requirements.txt into target_dir as wheels built for the Lambda runtime."""
+    subprocess.run([
+        sys.executable, '-m', 'pip', 'install',
+        '--requirement', requirements_path,
+        '--target', target_dir,
+        '--platform', PLATFORMS[arch],
+        '--implementation', 'cp',
+        '--python-version', PYTHON_VERSION,
+        '--only-binary', ':all:',
+        '--upgrade',
+        '--quiet',
+    ], check=True)
+
+
+def copy_tree(source_dir:str, target_dir:str):
+    shutil.copytree(
+        source_dir, target_dir, dirs_exist_ok=True,
+        ignore=shutil.ignore_patterns(*EXCLUDED_FILES, *EXCLUDED_DIRS, '*.pyc'),
+    )
+
+
+def write_zip(source_dir:str, zip_path:str, prefix:str = ''):
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for root, dirs, files in os.walk(source_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                zip_file.write(path, os.path.join(prefix, os.path.relpath(path, source_dir)))
+    print(f"Built {zip_path} ({os.path.getsize(zip_path) / 1e6:.1f} MB)")
+
+
+def build(function_name:str, output_dir:str, arch:str = 'x86_64') -> tuple:
+    """
+    Builds <output_dir>/<function_name>.zip and, if the function has a requirements.txt,
+    <output_dir>/<function_name>-layer.zip.
+
+    Returns:
+        tuple: (function zip path, layer zip path or None)
+    """
+    function_dir = os.path.join(LAMBDAS_DIR, function_name)
+    if not os.path.isfile(os.path.join(function_dir, 'main.py')):
+        raise ValueError(f"No Lambda function at {function_dir}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        for package in imported_shared_packages(function_dir):
+            copy_tree(os.path.join(SRC_DIR, package), os.path.join(build_dir, package))
+        copy_tree(function_dir, build_dir)
+
+        function_zip = os.path.join(output_dir, f"{function_name}.zip")
+        write_zip(build_dir, function_zip)
+
+    layer_zip = None
+    requirements_path = os.path.join(function_dir, 'requirements.txt')
+    if os.path.exists(requirements_path):
+        with tempfile.TemporaryDirectory() as layer_dir:
+            install_requirements(requirements_path, layer_dir, arch)
+
+            # layers are extracted to /opt, Python packages are read from /opt/python
+            layer_zip = os.path.join(output_dir, f"{function_name}-layer.zip")
+            write_zip(layer_dir, layer_zip, prefix='python')
+
+    return function_zip, layer_zip
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build Lambda deployment packages")
+    parser.add_argument("functions", nargs="+", help="function directories under src/lambdas (e.g. transform_lambda)")
+    parser.add_argument("--arch", choices=list(PLATFORMS), default='x86_64', help="Lambda architecture")
+    parser.add_argument("--output", default='dist', help="directory the zips are written to")
+    args = parser.parse_args()
+
+    for function_name in args.functions:
+        build(function_name, args.output, args.arch)
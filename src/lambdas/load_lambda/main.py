@@ -1,16 +1,94 @@
 import json,os,json
+import io
+import gzip
+import csv
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from botocore.config import Config
 import pandas as pd
 import numpy as np
 import psycopg2
 from psycopg2 import sql
 from psycopg2.extras import execute_values
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for parquet processed files
+    pa = pq = None
+
+try:
+    import orjson
+except ImportError:  # stdlib json is used without it
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # only needed for 'zstd' compressed processed files
+    zstandard = None
+
+# concurrent S3 I/O
+S3_MAX_WORKERS = int(os.getenv('S3_MAX_WORKERS', 8))
+S3_MAX_ATTEMPTS = int(os.getenv('S3_MAX_ATTEMPTS', 4))
+# retries are botocore's standard mode (throttling, 5xx and connection errors, with backoff), per call
+S3_CLIENT_CONFIG = Config(max_pool_connections=S3_MAX_WORKERS, retries={'max_attempts': S3_MAX_ATTEMPTS, 'mode': 'standard'})
+
+# schema migrations (staging join keys, dimension lookup indexes) applied before each load
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# streaming load
+STAGING_BATCH_SIZE = int(os.getenv('STAGING_BATCH_SIZE', 5000))
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+STAGING_COLUMNS = [
+    "auction_date","auction_id","vin","seller_type","reserve_status","reserve_met","auction_status",
+    "auction_title","auction_subtitle","make","model","exterior_color","interior_color",
+    "body_style","mileage","engine","drivetrain","transmission","transmission_type", "gears",
+    "title_status_cleaned","title_state","city","state","bid_count", "view_count", "watcher_count",
+    "highest_bid_value","max_bid","min_bid","mean_bid","median_bid","bid_range","bids",
+    "highlight_count","equipment_count","mod_count","flaw_count","service_count","included_items_count",
+    "video_count","manufacture_year","location","auction_url","seller"
+]
+
+# canonical join keys written with each staging row: key column -> (source column, case folding)
+# keys are trimmed once here so update_dims.sql can join them to the dimension tables with plain equality
+STAGING_KEY_COLUMNS = {
+    "auction_status_key": ("auction_status", "lower"),
+    "reserve_status_key": ("reserve_status", "lower"),
+    "body_style_key": ("body_style", "lower"),
+    "seller_type_key": ("seller_type", "lower"),
+    "drivetrain_key": ("drivetrain", "upper"),
+    "transmission_key": ("transmission_type", "lower"),
+    "make_key": ("make", None),
+    "model_key": ("model", None),
+    "city_key": ("city", None),
+    "title_state_key": ("title_state", "upper"),
+    "vin_key": ("vin", None),
+}
+STAGING_INSERT_COLUMNS = STAGING_COLUMNS + list(STAGING_KEY_COLUMNS)
+
+# 'copy' streams rows with COPY ... FROM STDIN (falls back to 'insert' on error); 'insert' uses execute_values
+STAGING_LOAD_METHOD = os.getenv('STAGING_LOAD_METHOD', 'copy')
+
+# counts returned by the auction_fact upsert in update_dims.sql, in column order
+AUCTION_FACT_LOAD_STATS = ("inserted", "updated", "unchanged")
+
+# batches are deduplicated on their own; this removes duplicates across batches
+DEDUPLICATE_STAGING_SQL = """
+DELETE FROM staging a
+USING staging b
+WHERE a.auction_id = b.auction_id
+    AND (a.auction_date < b.auction_date OR (a.auction_date = b.auction_date AND a.ctid < b.ctid))
+"""
+
 
 def update_dim_tables(cursor):
     """
     Runs the SQL script to update dimension and fact tables.
     Prints which section is being executed.
+
+    Returns:
+        dict: auction_fact load statistics, i.e. number of inserted, updated and unchanged auctions
     """
 
     section_names = [
@@ -31,6 +109,7 @@ def update_dim_tables(cursor):
         script = f.read()
 
     sql_script = script.split(";")
+    load_stats = {}
 
     for i, (section_name, statement) in enumerate(zip(section_names, sql_script)):
         sql_block = statement.strip()
@@ -44,8 +123,102 @@ def update_dim_tables(cursor):
         except Exception as e:
             print(f"Error in section: {section_name}")
             raise 3
+
+        # the auction_fact upsert reports how many auctions it inserted/updated/left unchanged
+        if section_name == "LOAD auction_fact":
+            load_stats = dict(zip(AUCTION_FACT_LOAD_STATS, cursor.fetchone()))
+            print(f"auction_fact: {load_stats}")
+
+    return load_stats
     
 
+def apply_migrations(cursor, migrations_dir:str = MIGRATIONS_DIR) -> list:
+    """
+    Applies the SQL files in `migrations_dir` that have not been applied yet, in file name order.
+    Applied files are recorded in `schema_migrations`, so each migration runs once per database.
+
+    Returns:
+        list: Names of the migrations applied by this call
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """)
+    cursor.execute("SELECT name FROM schema_migrations")
+    already_applied = {row[0] for row in cursor.fetchall()}
+
+    applied = []
+    for file_name in sorted(os.listdir(migrations_dir)):
+        if not file_name.endswith('.sql') or file_name in already_applied:
+            continue
+
+        print(f"Applying migration: {file_name}")
+        with open(os.path.join(migrations_dir, file_name), "r") as f:
+            cursor.execute(f.read())
+        cursor.execute("INSERT INTO schema_migrations(name) VALUES (%s)", (file_name,))
+        applied.append(file_name)
+
+    return applied
+
+
+def run_concurrently(fn, items:list, max_workers:int = S3_MAX_WORKERS) -> list:
+    """
+    Runs fn(item) for every item on a bounded thread pool. S3 calls are retried by the client
+    (see S3_CLIENT_CONFIG).
+
+    Results are returned in the same order as `items`. The first error is raised.
+    """
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        return list(executor.map(fn, items))
+
+
+def json_loads(content):
+    """Decodes JSON bytes with orjson if installed, or stdlib json for documents orjson rejects (e.g. NaN literals)."""
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(content)
+
+
+# read_body & iter_body_lines read objects as src/auction_transform/compression.py does (this
+# function doesn't ship the package), tests/test_compression.py keeps them in sync
+def read_body(response:dict) -> bytes:
+    """The body of a get_object response, decompressed if it was stored gzip or zstd compressed (by ContentEncoding or magic bytes)."""
+    body = response['Body'].read()
+    content_encoding = response.get('ContentEncoding')
+    if content_encoding == 'gzip' or body[:2] == b'\x1f\x8b':
+        return gzip.decompress(body)
+    if content_encoding == 'zstd' or body[:4] == b'\x28\xb5\x2f\xfd':
+        if zstandard is None:
+            raise ImportError("zstandard is required to read 'zstd' compressed processed files")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    return body
+
+
+def iter_body_lines(response:dict):
+    """
+    Yields the lines of a get_object response's body as it is streamed, decompressing gzip or zstd
+    bodies on the fly. Like `read_body`, the compression is taken from the ContentEncoding or, for
+    objects stored without one, from the magic bytes peeked at the start of the stream.
+    """
+    content_encoding = response.get('ContentEncoding')
+    body = io.BufferedReader(response['Body'], buffer_size=STREAM_CHUNK_SIZE)
+    magic = body.peek(4)[:4]
+    if content_encoding == 'gzip' or magic[:2] == b'\x1f\x8b':
+        yield from gzip.GzipFile(fileobj=body)
+    elif content_encoding == 'zstd' or magic == b'\x28\xb5\x2f\xfd':
+        if zstandard is None:
+            raise ImportError("zstandard is required to read 'zstd' compressed processed files")
+        yield from io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(body), buffer_size=STREAM_CHUNK_SIZE)
+    else:
+        yield from body
+
 
 def read_json_from_s3(s3_client, bucket_name:str, key:str)->list:
     """
@@ -62,10 +235,79 @@ def read_json_from_s3(s3_client, bucket_name:str, key:str)->list:
 
 
     response = s3_client.get_object(Bucket=bucket_name, Key=key)
-    content = response['Body'].read().decode('utf-8')
+    content = read_body(response)
+
+    return [json_loads(line) for line in content.splitlines() if line.strip()]
+
+
+def parquet_table_to_frame(table):
+    """Converts a processed auctions Arrow table to the NDJSON record shape (epoch ms auction_date, list bids)."""
+    auction_date_idx = table.schema.get_field_index('auction_date')
+    table = table.set_column(auction_date_idx, 'auction_date', table['auction_date'].cast(pa.int64()))
+
+    df = table.to_pandas()
+    df['bids'] = table['bids'].to_pylist()
+    return df
+
+
+def read_parquet_from_s3(s3_client, bucket_name:str, key:str):
+    """
+    Reads a processed auctions parquet file from S3 into a DataFrame.
+
+    auction_date is returned as epoch milliseconds and bids as Python lists, the same
+    shape as the NDJSON files read by `read_json_from_s3`.
+
+    Parameters:
+        bucket_name (str): Name of the S3 bucket
+        key (str): Path/key to the parquet file (e.g. '2024-01-05.parquet')
+
+    Returns:
+        pd.DataFrame: Processed auctions
+    """
+    if pq is None:
+        raise ImportError("pyarrow is required to read parquet processed files")
+
+    response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    table = pq.read_table(io.BytesIO(response['Body'].read()))
+    return parquet_table_to_frame(table)
+
+
+def iter_processed_batches(s3_client, bucket_name:str, key:str, batch_size:int = STAGING_BATCH_SIZE):
+    """
+    Yields a processed object from S3 as DataFrames of at most `batch_size` auctions.
+
+    NDJSON objects are read line by line from the StreamingBody (decompressed on the fly if they
+    are stored gzip or zstd compressed), so only the current batch of records is held in memory. Parquet objects are decoded one record batch at a time.
+
+    Parameters:
+        bucket_name (str): Name of the S3 bucket
+        key (str): Path/key to the processed file
+        batch_size (int): Maximum number of auctions per yielded DataFrame
+
+    Yields:
+        pd.DataFrame: A batch of processed auctions
+    """
+    response = s3_client.get_object(Bucket=bucket_name, Key=key)
+
+    if key.endswith('.parquet'):
+        if pq is None:
+            raise ImportError("pyarrow is required to read parquet processed files")
+        parquet_file = pq.ParquetFile(io.BytesIO(response['Body'].read()))
+        for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+            yield parquet_table_to_frame(pa.Table.from_batches([record_batch]))
+        return
+
+    batch = []
+    for line in iter_body_lines(response):
+        if not line.strip():
+            continue
+        batch.append(json_loads(line))
+        if len(batch) >= batch_size:
+            yield pd.DataFrame(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch)
 
-    return [json.loads(line) for line in content.splitlines()]
-    
 
 def psycopg_connection(db_user:str,db_password:str,db_host:str,db_port:int,db_name:str):
     connection = psycopg2.connect(
@@ -80,37 +322,126 @@ def psycopg_connection(db_user:str,db_password:str,db_host:str,db_port:int,db_na
     return connection, cursor
 
 
-def load_to_postgres(df, conn, cursor):
-        insert_columns = [
-            "auction_date","auction_id","vin","seller_type","reserve_status","reserve_met","auction_status",
-            "auction_title","auction_subtitle","make","model","exterior_color","interior_color",
-            "body_style","mileage","engine","drivetrain","transmission","transmission_type", "gears",
-            "title_status_cleaned","title_state","city","state","bid_count", "view_count", "watcher_count",
-            "highest_bid_value","max_bid","min_bid","mean_bid","median_bid","bid_range","bids",
-            "highlight_count","equipment_count","mod_count","flaw_count","service_count","included_items_count",
-            "video_count","manufacture_year","location","auction_url","seller"  
-        ]
-        insert_df = df[insert_columns]
-        
-        insert_df = insert_df.replace({np.nan: None})
-        insert_df = insert_df.sort_values('auction_date', ascending=False).reset_index(drop=True)
-        insert_df = insert_df.drop_duplicates('auction_id', keep='first')
+def add_staging_keys(df):
+    """
+    Adds the canonical join keys in STAGING_KEY_COLUMNS to `df`: the source column trimmed of
+    spaces (same as SQL TRIM) and, where set, lower/upper cased. Non-string values become NaN.
+    """
+    for key_column, (source_column, case) in STAGING_KEY_COLUMNS.items():
+        key = df[source_column].astype(object).str.strip(' ')
+        if case == 'lower':
+            key = key.str.lower()
+        elif case == 'upper':
+            key = key.str.upper()
+        df[key_column] = key
+    return df
+
+
+def prepare_staging_rows(df) -> list:
+    """Selects the staging columns, adds the join keys, replaces NaN with None and keeps the latest record per auction_id."""
+    insert_df = add_staging_keys(df[STAGING_COLUMNS].copy())
 
-        data = list(insert_df.itertuples(index=False, name=None))
-        query = f"INSERT INTO staging ({', '.join(insert_columns)}) VALUES %s"
+    insert_df = insert_df.replace({np.nan: None})
+    insert_df = insert_df.sort_values('auction_date', ascending=False).reset_index(drop=True)
+    insert_df = insert_df.drop_duplicates('auction_id', keep='first')
+
+    return list(insert_df.itertuples(index=False, name=None))
+
+
+def format_copy_value(value):
+    """
+    Formats a staging value for COPY CSV input. None stays None (written unquoted, i.e. NULL),
+    integral floats become ints so they fit integer columns, and bid lists become array literals.
+    """
+    if value is None:
+        return None
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return '{' + ','.join(str(int(item)) for item in value) + '}'
+    return value
+
+
+def copy_into_staging(cursor, rows:list):
+    """Bulk loads rows into staging with a single `COPY staging (...) FROM STDIN` in CSV format."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NOTNULL)
+    writer.writerows([format_copy_value(value) for value in row] for row in rows)
+    buffer.seek(0)
+
+    query = f"COPY staging ({', '.join(STAGING_INSERT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    cursor.copy_expert(query, buffer)
+
+
+def insert_into_staging(cursor, rows:list, method:str = STAGING_LOAD_METHOD):
+    """
+    Loads rows into staging with COPY (method='copy') or execute_values (method='insert').
+    If COPY fails, the batch is rolled back to a savepoint and inserted with execute_values instead.
+    """
+    if method == 'copy':
+        cursor.execute("SAVEPOINT staging_copy")
+        try:
+            copy_into_staging(cursor, rows)
+            cursor.execute("RELEASE SAVEPOINT staging_copy")
+            return
+        except psycopg2.Error as e:
+            print(f"COPY into staging failed, falling back to INSERT: {e}")
+            cursor.execute("ROLLBACK TO SAVEPOINT staging_copy")
+
+    query = f"INSERT INTO staging ({', '.join(STAGING_INSERT_COLUMNS)}) VALUES %s"
+    execute_values(cursor, query, rows, page_size=150)
+
+
+def load_to_postgres(df, conn, cursor):
+        data = prepare_staging_rows(df)
 
         # empty staging
         cursor.execute("TRUNCATE TABLE staging")
         conn.commit()
 
         # insert new data
-        execute_values(cursor, query, data, page_size=150)
+        insert_into_staging(cursor, data)
      
         # update dim & fact tables
-        update_dim_tables(cursor)
+        load_stats = update_dim_tables(cursor)
 
         # commit changes   
         conn.commit()
+        return load_stats
+
+
+def load_to_postgres_streaming(s3_client, bucket_name:str, obj_keys:list, conn, cursor, batch_size:int = STAGING_BATCH_SIZE) -> dict:
+    """
+    Streams processed objects into staging batch by batch, then updates the dim & fact tables once.
+
+    Unlike `load_to_postgres`, the auctions are never collected into one DataFrame: each batch from
+    `iter_processed_batches` is inserted into staging as soon as it is read, so the Lambda's peak
+    memory is bounded by `batch_size` rather than by the number of loaded days. Duplicate auction_ids
+    across batches are removed in staging (latest auction_date wins) before the dims are updated.
+
+    Returns:
+        dict: auction_fact load statistics (see `update_dim_tables`)
+    """
+    # empty staging
+    cursor.execute("TRUNCATE TABLE staging")
+    conn.commit()
+
+    total_records = 0
+    for obj_key in obj_keys:
+        for batch_df in iter_processed_batches(s3_client, bucket_name, obj_key, batch_size):
+            insert_into_staging(cursor, prepare_staging_rows(batch_df))
+            total_records += len(batch_df)
+        print(f"Streamed {obj_key} into staging ({total_records} records so far)")
+
+    # keep the latest record per auction_id
+    cursor.execute(DEDUPLICATE_STAGING_SQL)
+
+    # update dim & fact tables
+    load_stats = update_dim_tables(cursor)
+
+    # commit changes
+    conn.commit()
+    return load_stats
 
 
 def lambda_handler(event, context):
@@ -125,6 +456,7 @@ def lambda_handler(event, context):
     db_host = os.getenv('DB_HOST')
     db_port = os.getenv('DB_PORT')
     db_name = os.getenv('DB_NAME')
+    stream_load = os.getenv('STREAM_LOAD', 'false').lower() == 'true'
 
 
     conn = None,
@@ -132,23 +464,49 @@ def lambda_handler(event, context):
 
     try:
         # init s3 client, db connection
-        s3_client = boto3.client('s3')
+        s3_client = boto3.client('s3', config=S3_CLIENT_CONFIG)
         conn, cursor = psycopg_connection(db_user, db_password, db_host, db_port, db_name)
 
-        # read processed auctions into a list
+        # add staging key columns & dim lookup indexes if missing
+        apply_migrations(cursor)
+        conn.commit()
+
+        # stream processed objects into staging in bounded batches
+        if stream_load:
+            load_stats = load_to_postgres_streaming(s3_client, processed_auctions_bucket, processed_obj_keys, conn, cursor)
+            return {
+                "status": 200,
+                "load_stats": load_stats
+            }
+
+        # read processed objects concurrently (results keep the order of processed_obj_keys)
+        def read_processed_object(obj_key):
+            if obj_key.endswith('.parquet'):
+                return read_parquet_from_s3(s3_client, processed_auctions_bucket, obj_key)
+            return read_json_from_s3(s3_client, processed_auctions_bucket, obj_key)
+
+        objects_data = run_concurrently(read_processed_object, processed_obj_keys, S3_MAX_WORKERS)
+
+        # collect processed auctions into a list (NDJSON) or frames (parquet)
         auctions_data = []
-        for obj_key in processed_obj_keys:
-            obj_data = read_json_from_s3(s3_client, processed_auctions_bucket, obj_key)
-            auctions_data.extend(obj_data)
+        parquet_frames = []
+        for obj_data in objects_data:
+            if isinstance(obj_data, pd.DataFrame):
+                parquet_frames.append(obj_data)
+            else:
+                auctions_data.extend(obj_data)
 
         # create df
         df = pd.DataFrame(auctions_data)
+        if parquet_frames:
+            df = pd.concat([df] + parquet_frames, ignore_index=True) if auctions_data else pd.concat(parquet_frames, ignore_index=True)
 
         # load to PostreSQL data warehouse
-        load_to_postgres(df, conn, cursor)
+        load_stats = load_to_postgres(df, conn, cursor)
 
         return {
-            "status": 200
+            "status": 200,
+            "load_stats": load_stats
         }
 
     except Exception as e:
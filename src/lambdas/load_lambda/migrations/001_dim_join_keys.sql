@@ -0,0 +1,34 @@
+/*
+==================================================================
+    Canonical join keys on staging
+    - written alongside each staging row by prepare_staging_rows
+      (load_lambda/main.py)
+==================================================================
+*/
+ALTER TABLE staging
+    ADD COLUMN IF NOT EXISTS auction_status_key TEXT,
+    ADD COLUMN IF NOT EXISTS reserve_status_key TEXT,
+    ADD COLUMN IF NOT EXISTS body_style_key TEXT,
+    ADD COLUMN IF NOT EXISTS seller_type_key TEXT,
+    ADD COLUMN IF NOT EXISTS drivetrain_key TEXT,
+    ADD COLUMN IF NOT EXISTS transmission_key TEXT,
+    ADD COLUMN IF NOT EXISTS make_key TEXT,
+    ADD COLUMN IF NOT EXISTS model_key TEXT,
+    ADD COLUMN IF NOT EXISTS city_key TEXT,
+    ADD COLUMN IF NOT EXISTS title_state_key TEXT,
+    ADD COLUMN IF NOT EXISTS vin_key TEXT;
+
+
+/*
+==================================================================
+    Dimension lookup indexes
+    - every dimension join in update_dims.sql is a plain equality
+      on one of these
+==================================================================
+*/
+CREATE INDEX IF NOT EXISTS state_dim_state_abbr_idx ON state_dim(state_abbr);
+CREATE INDEX IF NOT EXISTS state_dim_state_idx ON state_dim(state);
+CREATE INDEX IF NOT EXISTS city_dim_city_name_state_id_idx ON city_dim(city_name, state_id);
+CREATE INDEX IF NOT EXISTS vehicle_make_dim_make_idx ON vehicle_make_dim(make);
+CREATE INDEX IF NOT EXISTS vehicle_model_dim_model_make_id_idx ON vehicle_model_dim(model, make_id);
+CREATE INDEX IF NOT EXISTS vehicle_dim_vin_auction_id_idx ON vehicle_dim(vin, auction_id);
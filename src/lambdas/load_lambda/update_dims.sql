@@ -1,14 +1,13 @@
 
-
 /*
 =========================================
     LOAD auction_status_dim
 =========================================
 */
 INSERT INTO auction_status_dim(status)
-SELECT DISTINCT TRIM(LOWER(auction_status))
+SELECT DISTINCT auction_status_key
 FROM staging
-WHERE auction_status IS NOT NULL
+WHERE auction_status_key IS NOT NULL
 ON CONFLICT(status) DO NOTHING;
 
 
@@ -18,9 +17,9 @@ ON CONFLICT(status) DO NOTHING;
 =========================================
 */
 INSERT INTO reserve_status_dim(status)
-SELECT DISTINCT TRIM(LOWER(reserve_status))
+SELECT DISTINCT reserve_status_key
 FROM staging
-WHERE reserve_status IS NOT NULL
+WHERE reserve_status_key IS NOT NULL
 ON CONFLICT(status) DO NOTHING;
 
 /*
@@ -29,9 +28,9 @@ ON CONFLICT(status) DO NOTHING;
 =========================================
 */
 INSERT INTO body_style_dim(body_style)
-SELECT DISTINCT TRIM(LOWER(body_style))
+SELECT DISTINCT body_style_key
 FROM staging
-WHERE body_style IS NOT NULL
+WHERE body_style_key IS NOT NULL
 ON CONFLICT(body_style) DO NOTHING;
 
 /*
@@ -40,9 +39,9 @@ ON CONFLICT(body_style) DO NOTHING;
 =========================================
 */
 INSERT INTO seller_type_dim(seller_type)
-SELECT DISTINCT TRIM(LOWER(seller_type))
+SELECT DISTINCT seller_type_key
 FROM staging
-WHERE seller_type IS NOT NULL
+WHERE seller_type_key IS NOT NULL
 ON CONFLICT(seller_type) DO NOTHING;
 
 /*
@@ -51,9 +50,9 @@ ON CONFLICT(seller_type) DO NOTHING;
 =========================================
 */
 INSERT INTO drivetrain_dim(drivetrain)
-SELECT DISTINCT TRIM(UPPER(drivetrain))
+SELECT DISTINCT drivetrain_key
 FROM staging
-WHERE drivetrain IS NOT NULL
+WHERE drivetrain_key IS NOT NULL
 ON CONFLICT(drivetrain) DO NOTHING;
 
 /*
@@ -62,9 +61,9 @@ ON CONFLICT(drivetrain) DO NOTHING;
 =========================================
 */
 INSERT INTO transmission_dim(transmission)
-SELECT DISTINCT TRIM(LOWER(transmission_type)) AS transmission
+SELECT DISTINCT transmission_key AS transmission
 FROM staging
-WHERE transmission_type IS NOT NULL
+WHERE transmission_key IS NOT NULL
 ORDER BY transmission ASC
 ON CONFLICT(transmission) DO NOTHING;
 
@@ -77,11 +76,13 @@ ON CONFLICT(transmission) DO NOTHING;
 */
 
 INSERT INTO city_dim(city_name, state_id)
-SELECT DISTINCT TRIM(s.city) AS city, sd.id
+SELECT DISTINCT s.city_key AS city, COALESCE(sd_abbr.id, sd_name.id)
 FROM staging s
-LEFT JOIN state_dim sd 
-	ON s.title_state=sd.state_abbr OR s.title_state=sd.state
-WHERE s.city IS NOT NULL
+LEFT JOIN state_dim sd_abbr
+	ON s.title_state=sd_abbr.state_abbr
+LEFT JOIN state_dim sd_name
+	ON s.title_state=sd_name.state
+WHERE s.city_key IS NOT NULL
 ORDER BY city ASC
 ON CONFLICT(city_name,state_id) DO NOTHING;
 
@@ -93,9 +94,9 @@ ON CONFLICT(city_name,state_id) DO NOTHING;
 ==================================================================
 */
 INSERT INTO vehicle_make_dim(make)
-SELECT DISTINCT TRIM(make) AS make
+SELECT DISTINCT make_key AS make
 FROM staging
-WHERE make IS NOT NULL
+WHERE make_key IS NOT NULL
 ORDER BY make ASC
 ON CONFLICT(make) DO NOTHING;
 
@@ -105,11 +106,11 @@ ON CONFLICT(make) DO NOTHING;
 ==================================================================
 */
 INSERT INTO vehicle_model_dim(model,make_id)
-SELECT DISTINCT TRIM(s.model) AS model,vmd.id
+SELECT DISTINCT s.model_key AS model,vmd.id
 FROM staging s
 LEFT JOIN vehicle_make_dim vmd
-	ON TRIM(s.make)=TRIM(vmd.make)
-WHERE model IS NOT NULL
+	ON s.make_key=vmd.make
+WHERE s.model_key IS NOT NULL
 ORDER BY model ASC
 ON CONFLICT(model,make_id) DO NOTHING;
 
@@ -123,7 +124,7 @@ INSERT INTO vehicle_dim(vin,auction_id,make_id,model_id,body_style_id,manufactur
     transmission_id,gear_count,drivetrain_id,exterior_color,interior_color,title_status, title_state,
 	equipment_count, mod_count,flaw_count,service_count,included_items_count)
 SELECT 
-	TRIM(s.vin) AS vin,
+	s.vin_key AS vin,
 	s.auction_id,
 	make_dim.id AS make_id,
 	model_dim.id AS model_id,
@@ -146,15 +147,15 @@ SELECT
 	
 FROM staging s
 LEFT JOIN vehicle_make_dim make_dim
-	ON TRIM(s.make)=make_dim.make
+	ON s.make_key=make_dim.make
 LEFT JOIN vehicle_model_dim model_dim
-	ON TRIM(s.model)=model_dim.model AND make_dim.id=model_dim.make_id
+	ON s.model_key=model_dim.model AND make_dim.id=model_dim.make_id
 LEFT JOIN body_style_dim bsd
-	ON TRIM(LOWER(s.body_style))=bsd.body_style
+	ON s.body_style_key=bsd.body_style
 LEFT JOIN transmission_dim td
-	ON TRIM(LOWER(s.transmission_type))=td.transmission
+	ON s.transmission_key=td.transmission
 LEFT JOIN drivetrain_dim dd
-	ON TRIM(UPPER(s.drivetrain))=dd.drivetrain
+	ON s.drivetrain_key=dd.drivetrain
 ON CONFLICT(vin,auction_id) 
 DO UPDATE SET
 	make_id = EXCLUDED.make_id,
@@ -180,44 +181,92 @@ DO UPDATE SET
 /*
 ==================================================================
     LOAD auction_fact
+    - keyed upsert on auction_id: new auctions are inserted, existing
+      ones are only rewritten when a column actually changed
+    - returns one row of load statistics (inserted, updated, unchanged)
 ==================================================================
 */
-INSERT INTO auction_fact
-SELECT 
-	s.auction_id,
-	TO_TIMESTAMP(s.auction_date / 1000)::timestamptz AS auction_time,
-	vd.vehicle_id,
-	asd.id AS auction_status,
-	rsd.id AS reserve_status,
-	sd.id AS auction_state, 
-	cd.id AS auction_city,
-	std.id AS seller_type,
-	s.view_count,
-	s.watcher_count,
-	s.bid_count,
-	s.max_bid,
-	s.min_bid,
-	s.mean_bid,
-	s.median_bid,
-	s.bid_range,
-	s.bids,
-	s.highlight_count,
-    s.video_count,
-	s.auction_title,
-	s.auction_subtitle,
-	s.auction_url
-FROM staging s
-LEFT JOIN vehicle_dim vd 
-	ON TRIM(s.vin)=vd.vin AND s.auction_id=vd.auction_id
-LEFT JOIN auction_status_dim asd
-	ON TRIM(LOWER(s.auction_status))=asd.status
-LEFT JOIN reserve_status_dim rsd
-	ON TRIM(LOWER(s.reserve_status))=rsd.status
-LEFT JOIN state_dim sd
-	ON TRIM(UPPER(s.title_state))=sd.state_abbr
-LEFT JOIN city_dim CD
-	ON TRIM(s.city)=cd.city_name AND sd.id=cd.state_id
-LEFT JOIN seller_type_dim std
-	ON TRIM(LOWER(s.seller_type))=std.seller_type
-WHERE s.auction_id IS NOT NULL
-ON CONFLICT(auction_id) DO NOTHING; 
\ No newline at end of file
+WITH upserted AS (
+	INSERT INTO auction_fact(auction_id,auction_time,vehicle_id,auction_status,reserve_status,auction_state,
+		auction_city,seller_type,view_count,watcher_count,bid_count,max_bid,min_bid,mean_bid,median_bid,
+		bid_range,bids,highlight_count,video_count,auction_title,auction_subtitle,auction_url)
+	SELECT 
+		s.auction_id,
+		TO_TIMESTAMP(s.auction_date / 1000)::timestamptz AS auction_time,
+		vd.vehicle_id,
+		asd.id AS auction_status,
+		rsd.id AS reserve_status,
+		sd.id AS auction_state, 
+		cd.id AS auction_city,
+		std.id AS seller_type,
+		s.view_count,
+		s.watcher_count,
+		s.bid_count,
+		s.max_bid,
+		s.min_bid,
+		s.mean_bid,
+		s.median_bid,
+		s.bid_range,
+		s.bids,
+		s.highlight_count,
+		s.video_count,
+		s.auction_title,
+		s.auction_subtitle,
+		s.auction_url
+	FROM staging s
+	LEFT JOIN vehicle_dim vd 
+		ON s.vin_key=vd.vin AND s.auction_id=vd.auction_id
+	LEFT JOIN auction_status_dim asd
+		ON s.auction_status_key=asd.status
+	LEFT JOIN reserve_status_dim rsd
+		ON s.reserve_status_key=rsd.status
+	LEFT JOIN state_dim sd
+		ON s.title_state_key=sd.state_abbr
+	LEFT JOIN city_dim cd
+		ON s.city_key=cd.city_name AND sd.id=cd.state_id
+	LEFT JOIN seller_type_dim std
+		ON s.seller_type_key=std.seller_type
+	WHERE s.auction_id IS NOT NULL
+	ON CONFLICT(auction_id)
+	DO UPDATE SET
+		auction_time = EXCLUDED.auction_time,
+		vehicle_id = EXCLUDED.vehicle_id,
+		auction_status = EXCLUDED.auction_status,
+		reserve_status = EXCLUDED.reserve_status,
+		auction_state = EXCLUDED.auction_state,
+		auction_city = EXCLUDED.auction_city,
+		seller_type = EXCLUDED.seller_type,
+		view_count = EXCLUDED.view_count,
+		watcher_count = EXCLUDED.watcher_count,
+		bid_count = EXCLUDED.bid_count,
+		max_bid = EXCLUDED.max_bid,
+		min_bid = EXCLUDED.min_bid,
+		mean_bid = EXCLUDED.mean_bid,
+		median_bid = EXCLUDED.median_bid,
+		bid_range = EXCLUDED.bid_range,
+		bids = EXCLUDED.bids,
+		highlight_count = EXCLUDED.highlight_count,
+		video_count = EXCLUDED.video_count,
+		auction_title = EXCLUDED.auction_title,
+		auction_subtitle = EXCLUDED.auction_subtitle,
+		auction_url = EXCLUDED.auction_url
+	WHERE (auction_fact.auction_time, auction_fact.vehicle_id, auction_fact.auction_status, auction_fact.reserve_status,
+			auction_fact.auction_state, auction_fact.auction_city, auction_fact.seller_type, auction_fact.view_count,
+			auction_fact.watcher_count, auction_fact.bid_count, auction_fact.max_bid, auction_fact.min_bid,
+			auction_fact.mean_bid, auction_fact.median_bid, auction_fact.bid_range, auction_fact.bids,
+			auction_fact.highlight_count, auction_fact.video_count, auction_fact.auction_title,
+			auction_fact.auction_subtitle, auction_fact.auction_url)
+		IS DISTINCT FROM
+		(EXCLUDED.auction_time, EXCLUDED.vehicle_id, EXCLUDED.auction_status, EXCLUDED.reserve_status,
+			EXCLUDED.auction_state, EXCLUDED.auction_city, EXCLUDED.seller_type, EXCLUDED.view_count,
+			EXCLUDED.watcher_count, EXCLUDED.bid_count, EXCLUDED.max_bid, EXCLUDED.min_bid,
+			EXCLUDED.mean_bid, EXCLUDED.median_bid, EXCLUDED.bid_range, EXCLUDED.bids,
+			EXCLUDED.highlight_count, EXCLUDED.video_count, EXCLUDED.auction_title,
+			EXCLUDED.auction_subtitle, EXCLUDED.auction_url)
+	RETURNING (xmax = 0) AS inserted
+)
+SELECT
+	COUNT(*) FILTER (WHERE inserted) AS inserted,
+	COUNT(*) FILTER (WHERE NOT inserted) AS updated,
+	(SELECT COUNT(*) FROM staging WHERE auction_id IS NOT NULL) - COUNT(*) AS unchanged
+FROM upserted;
@@ -1,26 +1,222 @@
 import json
+import re
+import time
+import gzip
 import boto3
+import botocore
 import os
 from datetime import datetime
 
+try:
+    import zstandard
+except ImportError:  # only needed for 'zstd' object compression
+    zstandard = None
+
 
 s3 = boto3.client('s3')
 BUCKET_NAME = os.environ.get('AUCTION_URLS')
 RAW_RESCRAPE_FOLDER = os.environ.get('RAW_RESCRAPE_FOLDER')
 
+# queue index of pending & completed auction IDs, and the reports of ended auctions the rescrape job writes
+QUEUE_INDEX_KEY = f"{RAW_RESCRAPE_FOLDER}/queue/index.json"
+COMPLETED_PREFIX = f"{RAW_RESCRAPE_FOLDER}/completed/"
+
+# seconds before a newly queued auction is first rescraped; with the default 0 new URLs go into the
+# rescrape file of the invocation that received them, like before the queue existed, as nothing
+# invokes this Lambda without new URLs
+RESCRAPE_FIRST_DELAY = int(os.getenv('RESCRAPE_FIRST_DELAY', 0))
+# seconds before an auction a rescrape still found live is re-checked; the delay doubles after
+# every re-check that doesn't find the auction ended, up to RESCRAPE_MAX_DELAY. Due re-checks go
+# into the rescrape file of the next invocation.
+RESCRAPE_RECHECK_DELAY = int(os.getenv('RESCRAPE_RECHECK_DELAY', 6 * 3600))
+RESCRAPE_MAX_DELAY = int(os.getenv('RESCRAPE_MAX_DELAY', 48 * 3600))
+# re-checks before an auction is dropped from the queue
+RESCRAPE_MAX_ATTEMPTS = int(os.getenv('RESCRAPE_MAX_ATTEMPTS', 8))
+# URLs written per rescrape file; the rest stay due for the next one
+RESCRAPE_BATCH_LIMIT = int(os.getenv('RESCRAPE_BATCH_LIMIT', 1000))
+# completed auction IDs are remembered this long, to skip them if they are reported again
+COMPLETED_RETENTION = int(os.getenv('COMPLETED_RETENTION_DAYS', 30)) * 86400
+# attempts to write the index when another invocation updated it concurrently
+INDEX_WRITE_ATTEMPTS = 5
+# compression of the rescrape URL files & queue index: 'gzip', 'zstd' or 'none', recorded in their ContentEncoding
+# (same setting as src/auction_transform/compression.py, which the rescrape job reads them with; the
+# copied helpers below are kept in sync with it by tests/test_compression.py)
+OBJECT_COMPRESSION = os.getenv('OBJECT_COMPRESSION', 'none')
+
+AUCTION_ID_PATTERN = re.compile(r'/auctions/([^/?#]+)')
+
+
+def auction_id(url:str) -> str | None:
+    match = AUCTION_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def compress(body:bytes) -> dict:
+    """put_object arguments for a body compressed per OBJECT_COMPRESSION."""
+    if OBJECT_COMPRESSION == 'gzip':
+        return {'Body': gzip.compress(body, compresslevel=6, mtime=0), 'ContentEncoding': 'gzip'}
+    if OBJECT_COMPRESSION == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstandard is required for 'zstd' object compression")
+        return {'Body': zstandard.ZstdCompressor().compress(body), 'ContentEncoding': 'zstd'}
+    return {'Body': body}
+
+
+def read_body(response:dict) -> bytes:
+    """The body of a get_object response, decompressed if it was stored gzip or zstd compressed."""
+    body = response['Body'].read()
+    content_encoding = response.get('ContentEncoding')
+    if content_encoding == 'gzip' or body[:2] == b'\x1f\x8b':
+        return gzip.decompress(body)
+    if content_encoding == 'zstd' or body[:4] == b'\x28\xb5\x2f\xfd':
+        if zstandard is None:
+            raise ImportError("zstandard is required to read 'zstd' compressed objects")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    return body
+
+
+def read_queue_index() -> tuple:
+    """
+    Reads the queue index:
+        {"pending": {"<auction_id>": {"url": ..., "next_check": <epoch s>, "attempts": <int>}},
+         "completed": {"<auction_id>": <epoch s completed>}}
+
+    Returns:
+        tuple: (index, ETag of the index object or None if there is no index yet)
+    """
+    try:
+        response = s3.get_object(Bucket=BUCKET_NAME, Key=QUEUE_INDEX_KEY)
+    except botocore.exceptions.ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return {"pending": {}, "completed": {}}, None
+        raise
+    return json.loads(read_body(response)), response['ETag']
+
+
+def write_queue_index(index:dict, etag:str | None) -> bool:
+    """
+    Writes the index only if nobody else wrote it since it was read (conditional put on the ETag).
+
+    Returns:
+        bool: False if the index changed in the meantime and the update must be redone
+    """
+    condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+    try:
+        s3.put_object(
+            Bucket=BUCKET_NAME,
+            Key=QUEUE_INDEX_KEY,
+            ContentType='application/json',
+            **compress(json.dumps(index, separators=(',', ':')).encode('utf-8')),
+            **condition
+        )
+    except botocore.exceptions.ClientError as e:
+        if e.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict'):
+            return False
+        raise
+    return True
+
+
+def read_completed_reports() -> dict:
+    """Reads the rescrape job's reports of ended auctions. Returns {report key: [auction URLs]}."""
+    reports = {}
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=COMPLETED_PREFIX):
+        for obj in page.get('Contents', []):
+            body = read_body(s3.get_object(Bucket=BUCKET_NAME, Key=obj['Key'])).decode('utf-8')
+            reports[obj['Key']] = [line.strip() for line in body.splitlines() if line.strip()]
+    return reports
+
+
+def recheck_delay(attempts:int) -> int:
+    return min(RESCRAPE_RECHECK_DELAY * 2 ** (attempts - 1), RESCRAPE_MAX_DELAY)
+
+
+def update_queue(index:dict, urls:list, completed_urls:list, now:float) -> list:
+    """
+    Merges new and ended auctions into the index and takes the auctions that are due.
+
+      - Ended auctions (from the completed reports) move from pending to completed.
+      - New URLs are queued once per auction ID, unless the auction is already pending or completed,
+        and are first due `RESCRAPE_FIRST_DELAY` seconds from now (by default now, so they are
+        returned by this call).
+      - Due auctions, most overdue first, up to `RESCRAPE_BATCH_LIMIT`, are returned and rescheduled
+        with a doubling delay in case the re-check still finds them live. Auctions re-checked
+        `RESCRAPE_MAX_ATTEMPTS` times are dropped.
+
+    Returns:
+        list: The URLs to rescrape now
+    """
+    pending, completed = index["pending"], index["completed"]
+
+    for url in completed_urls:
+        key = auction_id(url)
+        if key:
+            pending.pop(key, None)
+            completed[key] = int(now)
+
+    for url in urls:
+        key = auction_id(url)
+        if key and key not in pending and key not in completed:
+            pending[key] = {"url": url, "next_check": int(now + RESCRAPE_FIRST_DELAY), "attempts": 0}
+
+    # forget completed auctions after the retention period
+    for key in [key for key, completed_at in completed.items() if now - completed_at > COMPLETED_RETENTION]:
+        del completed[key]
+
+    due = sorted(
+        (key for key, item in pending.items() if item["next_check"] <= now),
+        key=lambda key: pending[key]["next_check"]
+    )[:RESCRAPE_BATCH_LIMIT]
+
+    due_urls = []
+    for key in due:
+        item = pending[key]
+        if item["attempts"] >= RESCRAPE_MAX_ATTEMPTS:
+            print(f"Dropping {item['url']} after {item['attempts']} re-checks")
+            del pending[key]
+            continue
+        due_urls.append(item["url"])
+        item["next_check"] = int(now + recheck_delay(item["attempts"] + 1))
+        item["attempts"] += 1
+
+    return due_urls
+
 
 def lambda_handler(event, context):
     try:
-        # Get URLs from event
-        urls = event.get('rescrape_urls')
-        if not urls:
+        # Get URLs from event (may be empty: auctions queued earlier can be due)
+        urls = event.get('rescrape_urls') or []
+
+        # merge into the queue index, retrying if another invocation updated it concurrently
+        completed_reports = read_completed_reports()
+        completed_urls = [url for report_urls in completed_reports.values() for url in report_urls]
+        for _ in range(INDEX_WRITE_ATTEMPTS):
+            index, etag = read_queue_index()
+            due_urls = update_queue(index, urls, completed_urls, time.time())
+            if write_queue_index(index, etag):
+                break
+        else:
+            raise RuntimeError("Queue index kept changing, giving up")
+
+        # reports are merged into the index now
+        report_keys = list(completed_reports)
+        for i in range(0, len(report_keys), 1000):
+            s3.delete_objects(
+                Bucket=BUCKET_NAME,
+                Delete={'Objects': [{'Key': key} for key in report_keys[i:i + 1000]], 'Quiet': True}
+            )
+
+        print(f"Queue: {len(urls)} URLs received, {len(completed_urls)} ended, "
+              f"{len(index['pending'])} pending, {len(due_urls)} due")
+
+        if not due_urls:
             return {
-                'statusCode': 400,
-                'body': json.dumps('No URLs provided in the event.')
+                'statusCode': 204,
+                'body': json.dumps('No auctions due for rescrape.')
             }
 
         # Create file content
-        file_content = "\n".join(urls)
+        file_content = "\n".join(due_urls)
 
         # Generate unique key for S3
         timestamp = int(datetime.now().timestamp())
@@ -30,7 +226,8 @@ def lambda_handler(event, context):
         s3.put_object(
             Bucket=BUCKET_NAME,
             Key=s3_key,
-            Body=file_content.encode('utf-8')
+            ContentType='text/plain',
+            **compress(file_content.encode('utf-8'))
         )
 
         print(f"File uploaded to S3: {s3_key}")
@@ -0,0 +1,272 @@
+"""
+Compares the vectorized `auction_transform.clean_and_transform` with the row-wise implementation
+it replaced (`reference_clean_and_transform` below, kept verbatim from before the vectorization)
+on batches built from the saved auction fixtures.
+
+Every size is first checked for identical output (values, dtypes and element types, with
+`assert_frame_equal`), then both implementations are timed on the same input.
+
+    PYTHONPATH=src uv run src/rescrape/benchmark_clean.py                       # 10k & 100k rows
+    PYTHONPATH=src uv run src/rescrape/benchmark_clean.py --rows 10000 100000 1000000
+    PYTHONPATH=src uv run src/rescrape/benchmark_clean.py --rows 1000000 --skip-reference
+
+Results (1 vCPU, 6 GB RAM, Python 3.13, pandas 2.3.1):
+
+          rows   reference s  vectorized s   speedup  output
+         10000          3.69          1.09      3.4x  identical
+        100000         41.26         11.40      3.6x  identical
+       1000000             -        142.81         -  not checked (the reference runs out of memory)
+"""
+import re
+import sys
+import time
+import argparse
+
+import pandas as pd
+import numpy as np
+
+import auction_transform
+from benchmark_transform import load_raw_auctions
+
+
+def reference_clean_and_transform(df):
+    """clean_and_transform as it was before the vectorized engine (row-wise Series.apply callbacks)."""
+
+    # Convert 'auction_date' to datetime
+    df['auction_date'] = pd.to_datetime(df['auction_date'],utc=True)
+    df = df.sort_values('auction_date', ascending=False).reset_index(drop=True)
+
+    # extract auction id
+    def extract_auction_id(url:str)->str:
+        return url.strip().split("/")[4]
+
+    df['auction_id'] = df['auction_url'].apply(extract_auction_id)
+
+
+    # drop duplicates based on auction id
+    df = df.drop_duplicates('auction_id', keep='first')
+
+    # clean 'model'
+    df['model'] = df['model'].str.split('\n').str[0].str.strip()
+
+
+    # Convert 'mileage' to integer
+    def extract_mileage(value):
+        if pd.isna(value):
+            return None
+        match = re.search(r'[\d,]+',value)
+        if match:
+            return int(match.group(0).replace(',',''))
+        return None
+
+    df['mileage'] = df['mileage'].apply(extract_mileage)
+
+
+    # convert 'highest-bid_value' to float
+    df['highest_bid_value'] = df['highest_bid_value'].str.replace('$','').str.replace(',','').astype(float)
+
+    # Convert 'bid_count' to integer
+    df['bid_count'] = pd.to_numeric(df['bid_count'], errors='coerce')
+
+    # Convert 'view_count' to integer
+    df['view_count'] = df['view_count'].astype(str).str.replace(',', '', regex=False)
+    df['view_count'] = pd.to_numeric(df['view_count'], errors='coerce').fillna(0).astype(int)
+
+    # Convert 'watcher_count' to integer
+    df['watcher_count'] = df['watcher_count'].astype('str').replace(',','', regex=True)
+    df['watcher_count'] = pd.to_numeric(df['watcher_count'], errors="coerce").fillna(0).astype(int)
+
+    # clean 'auction status' - change 'sold to' to 'sold'
+    df['auction_status'] = df['auction_status'].str.replace('Sold to','Sold').replace('Reserve not met, bid to', 'Reserve not met')
+
+    # Create boolean col for reserve status
+    df['reserve_met'] = df['auction_status'].str.lower().eq('sold')
+
+    # remove 'follow' from seller
+    df['seller'] = df['seller'].str.split('\n').str[0].str.strip()
+
+    # clean bids
+    def clean_bids(bids_list):
+        try:
+            return [int(bid.replace("$",'').replace(',','')) for bid in bids_list]
+        except Exception as e:
+            return []
+
+    df['bids'] = df['bids'].apply(clean_bids)
+
+
+    # Split 'title_status' into 'title_status_clean' and 'title_state'
+    df['title_status_cleaned'] = df['title_status'].str.extract(r'^(.*?) \(')
+    df['title_state'] = df['title_status'].str.extract(r'\((.*?)\)')
+
+
+    # Split 'location' into 'city' and 'state'
+    def extract_city_state(location):
+            if pd.isna(location):
+                return None, None
+            try:
+                parts = location.rsplit(",", 1)
+                if len(parts) == 2:
+                    city = parts[0].strip()
+                    state = parts[1].strip().split(" ")[0]
+                    return city,state
+                else:
+                    return parts[0].strip(), None
+            except Exception:
+                raise
+
+    df[['city','state']] = df['location'].apply(extract_city_state).apply(pd.Series)
+
+
+    # clean transmission
+    def clean_transmission(trans_str):
+        if not trans_str or not isinstance(trans_str, str):
+            return None, None
+
+        trans_str = trans_str.lower()
+        transmission_type = 'Other'
+        if 'manual' in trans_str:
+            transmission_type = 'Manual'
+        elif 'auto' in trans_str:
+            transmission_type = 'Automatic'
+
+        match = re.search(r'(\d+)-speed', trans_str)
+        gears = int(match.group(1)) if match else None
+
+        return transmission_type, gears
+
+    df['transmission_type'], df['gears'] = zip(*df['transmission'].map(clean_transmission))
+    df['transmission_type'] = df['transmission_type'].astype('object')
+
+    # clean drivetrain
+    def clean_drivetrain(drive_str):
+        if not drive_str or not isinstance(drive_str, str):
+            return 'Other'
+
+        drive_str = drive_str.lower()
+
+        if '4wd' in drive_str and 'awd' in drive_str:
+            return '4WD/AWD'
+        elif 'front' in drive_str:
+            return 'FWD'
+        elif 'rear' in drive_str:
+            return 'RWD'
+        elif 'awd' in drive_str or 'all-wheel' in drive_str:
+            return 'AWD'
+        elif '4wd' in drive_str or 'four-wheel' in drive_str:
+            return '4WD'
+        else:
+            return 'Other'
+
+    df['drivetrain'] = df['drivetrain'].apply(clean_drivetrain)
+
+    # extract bids features
+    def extract_bid_features(bids_list):
+        if not bids_list or not isinstance(bids_list, list) or len(bids_list) < 2:
+            return pd.Series(
+                {
+                    'max_bid': np.nan,
+                    'min_bid': np.nan,
+                    'mean_bid': np.nan,
+                    'median_bid': np.nan,
+                    'bid_range': np.nan,
+                }
+            )
+
+        return pd.Series(
+            {
+                'max_bid': max(bids_list),
+                'min_bid': min(bids_list),
+                'mean_bid': np.mean(bids_list),
+                'median_bid': np.median(bids_list),
+                'bid_range': max(bids_list) - min(bids_list),
+            }
+        )
+
+    features_df = df['bids'].apply(extract_bid_features)
+    df = df.join(features_df)
+
+    # add count fields for auction flaws, services, equipment, extra items, highlights,
+    def count_list(x):
+        return len(x) if isinstance(x, list) else None
+
+    df['highlight_count'] = df['auction_highlights'].apply(count_list)
+    df['equipment_count'] = df['auction_equipment'].apply(count_list)
+    df['mod_count'] = df['modifications'].apply(count_list)
+    df['flaw_count'] = df['known_flaws'].apply(count_list)
+    df['service_count'] = df['services'].apply(count_list)
+    df['included_items_count'] = df['included_items'].apply(count_list)
+    df['video_count'] = df['auction_videos'].apply(count_list)
+
+
+    # extract manufacture year
+    def extract_manufacture_year(url):
+        if pd.isna(url):
+            return None
+        try:
+            return int(url.strip().split("/")[-1].split("-")[0])
+        except Exception:
+            None
+
+    df['manufacture_year'] = df['auction_url'].apply(extract_manufacture_year)
+
+    return df
+
+
+def build_input(rows:int):
+    """A valid auctions DataFrame of `rows` fixture auctions, as `clean_and_transform` receives it."""
+    fixtures_df, _ = auction_transform.extract_invalid_auctions(
+        auction_transform.create_auction_df(auction_transform.flatten_auctions(load_raw_auctions()))
+    )
+    copies = -(-rows // len(fixtures_df))
+    df = auction_transform.create_auction_df(auction_transform.flatten_auctions(load_raw_auctions(copies)))
+    valid_df, _ = auction_transform.extract_invalid_auctions(df)
+    return valid_df.iloc[:rows].copy()
+
+
+def assert_same_output(expected, output):
+    """Values & dtypes with assert_frame_equal, plus the Python types of object column elements."""
+    pd.testing.assert_frame_equal(output, expected)
+    for column in expected.columns:
+        if expected[column].dtype == object:
+            expected_types = expected[column].map(type).tolist()
+            if output[column].map(type).tolist() != expected_types:
+                raise AssertionError(f"element types of '{column}' differ")
+
+
+def timed(fn, df) -> tuple:
+    start = time.perf_counter()
+    output = fn(df.copy())
+    return time.perf_counter() - start, output
+
+
+def benchmark(sizes:list, skip_reference:bool = False) -> bool:
+    print(f"{'rows':>10}{'reference s':>14}{'vectorized s':>14}{'speedup':>10}  output")
+    ok = True
+    for rows in sizes:
+        valid_df = build_input(rows)
+        vectorized_seconds, output = timed(auction_transform.clean_and_transform, valid_df)
+        if skip_reference:
+            print(f"{len(valid_df):>10}{'-':>14}{vectorized_seconds:>14.2f}{'-':>10}  not checked")
+            continue
+
+        reference_seconds, expected = timed(reference_clean_and_transform, valid_df)
+        try:
+            assert_same_output(expected, output)
+            result = "identical"
+        except AssertionError as e:
+            result = f"DIFFERS: {e}"
+            ok = False
+        print(f"{len(valid_df):>10}{reference_seconds:>14.2f}{vectorized_seconds:>14.2f}"
+              f"{reference_seconds / vectorized_seconds:>9.1f}x  {result}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare clean_and_transform with the row-wise implementation it replaced")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="batch sizes (auctions)")
+    parser.add_argument("--skip-reference", action="store_true", help="time the vectorized engine only (no output check)")
+    args = parser.parse_args()
+
+    if not benchmark(args.rows, args.skip_reference):
+        sys.exit(1)
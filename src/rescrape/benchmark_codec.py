@@ -0,0 +1,90 @@
+"""
+Benchmarks the JSON backends of `auction_transform.codec` on a real-size raw auction file (the
+JSON array the transform Lambda reads) and on the NDJSON day files the pipeline writes for it,
+both built from the saved auction fixtures. 'baseline' is the stdlib decoding the pipeline used
+before the codec layer: bytes decoded to str, then `json.loads` once per document or line.
+
+    PYTHONPATH=src uv run src/rescrape/benchmark_codec.py
+    PYTHONPATH=src uv run src/rescrape/benchmark_codec.py --copies 2000 -n 10
+"""
+import gc
+import json
+import time
+import argparse
+
+from auction_transform import codec
+import auction_transform
+from benchmark_transform import load_raw_auctions, run_stages
+
+
+def baseline_loads(content:bytes):
+    return json.loads(content.decode('utf-8'))
+
+
+def baseline_loads_ndjson(content:bytes) -> list:
+    return [json.loads(line) for line in content.decode('utf-8').splitlines() if line]
+
+
+def best_time(fn, content, rounds:int) -> float:
+    # timed with the garbage collector off, as timeit does, so collections of earlier rounds' output don't add noise
+    best = None
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            fn(content)
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+    finally:
+        gc.enable()
+    return best
+
+
+def build_files(copies:int) -> tuple:
+    """Returns (raw auction file, NDJSON day files concatenated) as bytes, and the auction count."""
+    raw_auctions = load_raw_auctions(copies)
+    raw_file = json.dumps(raw_auctions).encode('utf-8')
+
+    cleaned_df = run_stages(raw_auctions)['clean_and_transform'][1]
+    day_files = b'\n'.join(
+        auction_transform.encode_part(group, 'ndjson')[0]
+        for _, group in cleaned_df.groupby(cleaned_df['auction_date'].dt.date)
+    )
+    return raw_file, day_files, len(raw_auctions)
+
+
+def benchmark(copies:int, rounds:int):
+    raw_file, day_files, auctions = build_files(copies)
+
+    # every backend must decode to the same records
+    expected_raw, expected_days = baseline_loads(raw_file), baseline_loads_ndjson(day_files)
+    for name in codec.available_codecs():
+        assert codec.loads(raw_file, name) == expected_raw, name
+        assert codec.loads_ndjson(day_files, name) == expected_days, name
+
+    print(f"{auctions} auctions: raw file {len(raw_file) / 1e6:.1f} MB, day files {len(day_files) / 1e6:.1f} MB, "
+          f"best of {rounds} rounds")
+    print(f"{'codec':<12}{'raw ms':>10}{'MB/s':>8}{'ndjson ms':>12}{'MB/s':>8}")
+
+    rows = [('baseline', baseline_loads, baseline_loads_ndjson)]
+    for name in codec.available_codecs():
+        rows.append((
+            name,
+            lambda content, name=name: codec.loads(content, name),
+            lambda content, name=name: codec.loads_ndjson(content, name),
+        ))
+
+    for name, loads, loads_ndjson in rows:
+        raw_seconds = best_time(loads, raw_file, rounds)
+        ndjson_seconds = best_time(loads_ndjson, day_files, rounds)
+        print(f"{name:<12}{raw_seconds * 1000:>10.1f}{len(raw_file) / 1e6 / raw_seconds:>8.0f}"
+              f"{ndjson_seconds * 1000:>12.1f}{len(day_files) / 1e6 / ndjson_seconds:>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the JSON codecs on a raw auction file and its NDJSON day files")
+    parser.add_argument("--copies", type=int, default=500, help="times each fixture is repeated (with its own auction ID)")
+    parser.add_argument("-n", "--rounds", type=int, default=5, help="decodes per codec; the best time is reported")
+    args = parser.parse_args()
+
+    benchmark(args.copies, args.rounds)
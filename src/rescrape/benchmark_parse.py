@@ -0,0 +1,93 @@
+"""
+Benchmarks `parse_auction_html` on saved auction pages, without a browser or network.
+
+Each fixture `<name>.html` can have an expected output `<name>.json` next to it; use --check
+to compare the parser against them before timing.
+
+    uv run src/rescrape/benchmark_parse.py                 # all fixtures, 50 rounds
+    uv run src/rescrape/benchmark_parse.py --check         # verify expected outputs first
+    uv run src/rescrape/benchmark_parse.py page.html -n 200
+    uv run src/rescrape/benchmark_parse.py --parser lxml   # compare tree builders
+"""
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+
+from scrape_auction import parse_auction_html, HTML_PARSER
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURE_URL = "https://carsandbids.com/auctions/{name}"
+
+
+def load_fixtures(paths:list) -> dict:
+    """Reads the given .html files (default: every fixture in FIXTURES_DIR) keyed by file name without extension."""
+    paths = paths or sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+    fixtures = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures[os.path.splitext(os.path.basename(path))[0]] = (path, f.read())
+    return fixtures
+
+
+def parse_quietly(html:str, name:str, parser:str) -> dict:
+    # the parser reports missing sections with print(); keep them out of the benchmark output
+    return parse_auction_html(html, FIXTURE_URL.format(name=name), parser=parser, quiet=True)
+
+
+def check_fixtures(fixtures:dict, parser:str) -> bool:
+    """Compares each fixture's parsed output with its expected .json file, if it has one."""
+    ok = True
+    for name, (path, html) in fixtures.items():
+        expected_path = os.path.splitext(path)[0] + '.json'
+        if not os.path.exists(expected_path):
+            print(f"{name}: no expected output, skipped")
+            continue
+
+        with open(expected_path, "r", encoding="utf-8") as f:
+            expected = json.load(f)
+        if parse_quietly(html, name, parser) == expected:
+            print(f"{name}: ok")
+        else:
+            print(f"{name}: output differs from {os.path.basename(expected_path)}")
+            ok = False
+    return ok
+
+
+def benchmark(fixtures:dict, rounds:int, parser:str):
+    """Parses every fixture `rounds` times and prints pages per second for each and overall."""
+    total_pages = 0
+    total_seconds = 0.0
+    print(f"parser: {parser}, {rounds} rounds")
+    print(f"{'fixture':<24}{'KB':>8}{'ms/page':>10}{'pages/s':>10}")
+    for name, (_, html) in fixtures.items():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            parse_quietly(html, name, parser)
+        elapsed = time.perf_counter() - start
+
+        total_pages += rounds
+        total_seconds += elapsed
+        print(f"{name:<24}{len(html) / 1024:>8.1f}{elapsed / rounds * 1000:>10.2f}{rounds / elapsed:>10.1f}")
+
+    print(f"{'all':<24}{'':>8}{total_seconds / total_pages * 1000:>10.2f}{total_pages / total_seconds:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parse_auction_html on saved auction pages")
+    parser.add_argument("pages", nargs="*", help="saved .html pages (default: fixtures/*.html)")
+    parser.add_argument("-n", "--rounds", type=int, default=50, help="times each page is parsed")
+    parser.add_argument("--check", action="store_true", help="compare against the expected .json outputs first")
+    parser.add_argument("--parser", default=HTML_PARSER, help="BeautifulSoup tree builder, e.g. html.parser or lxml")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.pages)
+    if not fixtures:
+        sys.exit("No pages to parse")
+
+    if args.check and not check_fixtures(fixtures, args.parser):
+        sys.exit(1)
+
+    benchmark(fixtures, args.rounds, args.parser)
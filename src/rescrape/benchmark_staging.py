@@ -0,0 +1,112 @@
+"""
+Compares the two ways the load Lambda (src/lambdas/load_lambda) fills the staging table:
+`COPY staging (...) FROM STDIN` ('copy', the default) and `execute_values` ('insert', the fallback),
+on staging rows built from the saved auction fixtures.
+
+Both methods load the same rows into a temporary `staging` table (it shadows any real one and is
+dropped with the session, so the benchmark can run against any database), and the table contents
+are checked to be identical, including values with quotes, newlines, empty strings and empty bid
+arrays. The connection uses the load Lambda's DB_* variables.
+
+    PYTHONPATH=src DB_HOST=localhost DB_USER=postgres uv run src/rescrape/benchmark_staging.py
+    PYTHONPATH=src DB_HOST=localhost DB_USER=postgres uv run src/rescrape/benchmark_staging.py --rows 200000
+
+Results (local PostgreSQL 18, 1 vCPU):
+
+      rows  method   seconds
+     50000  insert     10.42
+     50000  copy        3.23
+"""
+import os
+import sys
+import time
+import argparse
+import importlib.util
+
+import pandas as pd
+
+import auction_transform
+from auction_transform import codec
+from benchmark_transform import load_raw_auctions, run_stages
+
+LOAD_LAMBDA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambdas', 'load_lambda', 'main.py')
+
+# staging as the warehouse defines it, plus the join keys of migrations/001_dim_join_keys.sql
+STAGING_TABLE_SQL = """
+CREATE TEMP TABLE staging (
+    auction_date bigint, auction_id text, vin text, seller_type text, reserve_status text, reserve_met boolean,
+    auction_status text, auction_title text, auction_subtitle text, make text, model text, exterior_color text,
+    interior_color text, body_style text, mileage integer, engine text, drivetrain text, transmission text,
+    transmission_type text, gears integer, title_status_cleaned text, title_state text, city text, state text,
+    bid_count integer, view_count integer, watcher_count integer, highest_bid_value numeric, max_bid numeric,
+    min_bid numeric, mean_bid numeric, median_bid numeric, bid_range numeric, bids integer[], highlight_count integer,
+    equipment_count integer, mod_count integer, flaw_count integer, service_count integer, included_items_count integer,
+    video_count integer, manufacture_year integer, location text, auction_url text, seller text,
+    auction_status_key text, reserve_status_key text, body_style_key text, seller_type_key text, drivetrain_key text,
+    transmission_key text, make_key text, model_key text, city_key text, title_state_key text, vin_key text
+)
+"""
+
+
+def load_lambda_module():
+    spec = importlib.util.spec_from_file_location('load_lambda', LOAD_LAMBDA_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_rows(load_lambda, rows:int) -> list:
+    """`rows` staging rows, prepared from the NDJSON records the load Lambda reads, as `load_to_postgres` does."""
+    fixtures_count = len(run_stages(load_raw_auctions())['clean_and_transform'][1])
+    cleaned_df = run_stages(load_raw_auctions(-(-rows // fixtures_count)))['clean_and_transform'][1]
+    body, _ = auction_transform.encode_part(cleaned_df.iloc[:rows], 'ndjson')
+    df = pd.DataFrame(codec.loads_ndjson(body))
+
+    # values COPY CSV input has to escape or tell apart from NULL
+    df.loc[0, 'auction_title'] = 'he said "hi",\nnew line'
+    df.loc[1, 'auction_title'] = ''
+    df.at[2, 'bids'] = []
+    return load_lambda.prepare_staging_rows(df)
+
+
+def benchmark(rows:int):
+    load_lambda = load_lambda_module()
+    staging_rows = build_rows(load_lambda, rows)
+
+    conn, cursor = load_lambda.psycopg_connection(
+        os.getenv('DB_USER', 'postgres'), os.getenv('DB_PASSWORD'), os.getenv('DB_HOST', 'localhost'),
+        int(os.getenv('DB_PORT', 5432)), os.getenv('DB_NAME', 'postgres')
+    )
+    try:
+        cursor.execute(STAGING_TABLE_SQL)
+        conn.commit()
+
+        print(f"{'rows':>10}  {'method':<7}{'seconds':>8}")
+        contents = {}
+        for method in ('insert', 'copy'):
+            cursor.execute("TRUNCATE TABLE staging")
+            conn.commit()
+
+            start = time.perf_counter()
+            load_lambda.insert_into_staging(cursor, staging_rows, method)
+            conn.commit()
+            seconds = time.perf_counter() - start
+            print(f"{len(staging_rows):>10}  {method:<7}{seconds:>8.2f}")
+
+            cursor.execute("SELECT * FROM staging ORDER BY auction_id")
+            contents[method] = cursor.fetchall()
+    finally:
+        conn.close()
+
+    identical = contents['insert'] == contents['copy']
+    print("staging contents:", "identical" if identical else "DIFFER")
+    return identical
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare COPY and execute_values loads of the staging table")
+    parser.add_argument("--rows", type=int, default=50_000, help="staging rows loaded by each method")
+    args = parser.parse_args()
+
+    if not benchmark(args.rows):
+        sys.exit(1)
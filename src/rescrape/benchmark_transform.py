@@ -0,0 +1,134 @@
+"""
+Benchmarks each stage of the shared `auction_transform` pipeline on the saved auction fixtures,
+without S3 (the load stage is timed up to the encoded day files it would upload).
+
+The fixtures' expected parser outputs (`fixtures/<name>.json`) are the raw input. With --check the
+pipeline output is first compared with the golden file `fixtures/transformed.json`: the rescrape URLs
+and the cleaned records exactly as the NDJSON day files would hold them. Every change to the shared
+transform code should keep --check passing; --update-golden rewrites the golden file after an
+intended output change. tests/test_transform.py checks the golden file against the transform the
+pipeline replaced (tests/baseline_transform.py), so every intended difference is listed there.
+
+    PYTHONPATH=src uv run src/rescrape/benchmark_transform.py --check
+    PYTHONPATH=src uv run src/rescrape/benchmark_transform.py --copies 2000 -n 5
+    PYTHONPATH=src uv run src/rescrape/benchmark_transform.py --format parquet
+"""
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+
+import auction_transform
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+GOLDEN_PATH = os.path.join(FIXTURES_DIR, 'transformed.json')
+# a real-looking slug, so manufacture_year & co. are derived as for live URLs
+AUCTION_URL = "https://carsandbids.com/auctions/{name}{copy:05d}/2002-bmw-330i-sedan"
+
+
+def load_raw_auctions(copies:int = 1) -> list:
+    """Raw auction dicts from the fixtures' expected parser outputs, each repeated `copies` times with its own auction ID."""
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.json'))):
+        if path == GOLDEN_PATH:
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures.append((os.path.splitext(os.path.basename(path))[0], json.load(f)))
+
+    auctions = []
+    for copy in range(copies):
+        for name, auction in fixtures:
+            auctions.append({**auction, 'auction_url': AUCTION_URL.format(name=name.replace('_', ''), copy=copy)})
+    return auctions
+
+
+def run_stages(raw_auctions:list, file_format:str = 'ndjson') -> dict:
+    """Runs the pipeline and returns {stage: (seconds, output)}, in pipeline order."""
+    stages = {}
+
+    def timed(name, fn, *args):
+        start = time.perf_counter()
+        output = fn(*args)
+        stages[name] = (time.perf_counter() - start, output)
+        return output
+
+    columns = timed('flatten_auctions', auction_transform.flatten_auctions, raw_auctions)
+    df = timed('create_auction_df', auction_transform.create_auction_df, columns)
+    valid_df, _ = timed('extract_invalid_auctions', auction_transform.extract_invalid_auctions, df)
+    cleaned_df = timed('clean_and_transform', auction_transform.clean_and_transform, valid_df)
+
+    def encode_days(cleaned_df):
+        return [
+            auction_transform.encode_part(group, file_format)[0]
+            for _, group in cleaned_df.groupby(cleaned_df['auction_date'].dt.date)
+        ]
+    timed(f'encode_{file_format}', encode_days, cleaned_df)
+    return stages
+
+
+def pipeline_output(stages:dict) -> dict:
+    """The golden-file view of a run: rescrape URLs and the cleaned records as NDJSON rows."""
+    _, rescrape_urls = stages['extract_invalid_auctions'][1]
+    cleaned_df = stages['clean_and_transform'][1]
+    records = [json.loads(line) for line in cleaned_df.to_json(orient='records', lines=True).splitlines()]
+    return {"rescrape_urls": rescrape_urls, "records": records}
+
+
+def check_golden() -> bool:
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    output = pipeline_output(run_stages(load_raw_auctions()))
+
+    ok = True
+    for key in ("rescrape_urls", "records"):
+        # serialized, so that 12 and 12.0 differ
+        if json.dumps(output[key]) == json.dumps(expected[key]):
+            print(f"{key}: ok")
+        else:
+            print(f"{key}: output differs from {os.path.basename(GOLDEN_PATH)}")
+            ok = False
+    return ok
+
+
+def update_golden():
+    with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+        json.dump(pipeline_output(run_stages(load_raw_auctions())), f, indent=2)
+        f.write("\n")
+    print(f"Wrote {GOLDEN_PATH}")
+
+
+def benchmark(copies:int, rounds:int, file_format:str):
+    """Runs the pipeline `rounds` times and prints the best time of every stage."""
+    raw_auctions = load_raw_auctions(copies)
+    best = {}
+    for _ in range(rounds):
+        for stage, (seconds, _) in run_stages(raw_auctions, file_format).items():
+            best[stage] = min(best.get(stage, seconds), seconds)
+
+    print(f"{len(raw_auctions)} auctions, best of {rounds} rounds")
+    print(f"{'stage':<28}{'ms':>10}{'auctions/s':>14}")
+    for stage, seconds in best.items():
+        print(f"{stage:<28}{seconds * 1000:>10.1f}{len(raw_auctions) / seconds:>14.0f}")
+    total = sum(best.values())
+    print(f"{'all':<28}{total * 1000:>10.1f}{len(raw_auctions) / total:>14.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the auction_transform pipeline stages on the saved fixtures")
+    parser.add_argument("--copies", type=int, default=500, help="times each fixture is repeated (with its own auction ID)")
+    parser.add_argument("-n", "--rounds", type=int, default=5, help="pipeline runs; the best time per stage is reported")
+    parser.add_argument("--format", default='ndjson', choices=auction_transform.FILE_FORMATS, help="day file format for the encode stage")
+    parser.add_argument("--check", action="store_true", help="compare the output with the golden file first")
+    parser.add_argument("--update-golden", action="store_true", help="rewrite the golden file from the current output")
+    args = parser.parse_args()
+
+    if args.update_golden:
+        update_golden()
+        sys.exit(0)
+
+    if args.check and not check_golden():
+        sys.exit(1)
+
+    benchmark(args.copies, args.rounds, args.format)
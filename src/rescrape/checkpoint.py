@@ -0,0 +1,116 @@
+import os
+import json
+import re
+
+from auction_transform import compression
+
+
+# scratch objects for one rescrape run, keyed by the URL file it works through:
+#   {prefix}/scraped/batch-00003.json  raw auctions of a scraped micro-batch (written before transform & load)
+#   {prefix}/loaded/batch-00003.json   URLs, uploaded object keys & ended auction URLs of a batch that is in the processed bucket
+SCRAPED_DIR = 'scraped'
+LOADED_DIR = 'loaded'
+BATCH_KEY_PATTERN = re.compile(r'batch-(\d+)\.json$')
+
+
+def checkpoint_prefix(base_dir:str, urls_obj_key:str) -> str:
+    """Checkpoint prefix for a URL file, e.g. `rescrape/checkpoints/2025-07-03T10-00-00`."""
+    run_name = os.path.splitext(os.path.basename(urls_obj_key))[0]
+    return '/'.join(part.strip('/') for part in (base_dir or '', 'checkpoints', run_name) if part)
+
+
+def batch_key(prefix:str, stage:str, batch_id:int) -> str:
+    return f"{prefix}/{stage}/batch-{batch_id:05d}.json"
+
+
+def list_batch_keys(s3_client, bucket:str, prefix:str, stage:str) -> dict:
+    """Maps batch id -> object key for every checkpoint object of a stage."""
+    keys = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/{stage}/"):
+        for obj in page.get('Contents', []):
+            match = BATCH_KEY_PATTERN.search(obj['Key'])
+            if match:
+                keys[int(match.group(1))] = obj['Key']
+    return keys
+
+
+def read_json(s3_client, bucket:str, key:str):
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    return json.loads(compression.read_body(response))
+
+
+def write_json(s3_client, bucket:str, key:str, data):
+    compression.put_object(s3_client, bucket, key, json.dumps(data).encode('utf-8'), 'application/json')
+
+
+def load_checkpoint(s3_client, bucket:str, prefix:str) -> dict:
+    """
+    Reads the progress of an earlier, interrupted run of the same URL file.
+
+    Returns:
+        dict:
+            - completed_urls (set): URLs whose auctions were already loaded to the processed bucket
+            - uploaded_objects (list): processed object keys written by the loaded batches
+            - ended_urls (list): URLs of the auctions the loaded batches loaded (ended auctions)
+            - unloaded_batches (list): (batch_id, {"urls": [...], "auctions": [...]}) scraped but not loaded yet
+            - next_batch_id (int): id for the next micro-batch
+    """
+    scraped = list_batch_keys(s3_client, bucket, prefix, SCRAPED_DIR)
+    loaded = list_batch_keys(s3_client, bucket, prefix, LOADED_DIR)
+
+    completed_urls = set()
+    uploaded_objects = []
+    ended_urls = []
+    for batch_id in sorted(loaded):
+        batch = read_json(s3_client, bucket, loaded[batch_id])
+        completed_urls.update(batch['urls'])
+        uploaded_objects.extend(batch['uploaded_objects'])
+        ended_urls.extend(batch.get('ended_urls', []))
+
+    unloaded_batches = [
+        (batch_id, read_json(s3_client, bucket, scraped[batch_id]))
+        for batch_id in sorted(scraped) if batch_id not in loaded
+    ]
+
+    batch_ids = set(scraped) | set(loaded)
+    if batch_ids:
+        print(f"Resuming from checkpoint s3://{bucket}/{prefix}: {len(loaded)} batches loaded "
+              f"({len(completed_urls)} URLs), {len(unloaded_batches)} scraped but not loaded")
+
+    return {
+        "completed_urls": completed_urls,
+        "uploaded_objects": uploaded_objects,
+        "ended_urls": ended_urls,
+        "unloaded_batches": unloaded_batches,
+        "next_batch_id": max(batch_ids) + 1 if batch_ids else 0,
+    }
+
+
+def save_scraped_batch(s3_client, bucket:str, prefix:str, batch_id:int, urls:list, auctions:list):
+    """Stores a micro-batch's raw auctions, so a restart can load them without scraping again."""
+    write_json(s3_client, bucket, batch_key(prefix, SCRAPED_DIR, batch_id), {"urls": urls, "auctions": auctions})
+
+
+def save_loaded_batch(s3_client, bucket:str, prefix:str, batch_id:int, urls:list, uploaded_objects:list, ended_urls:list = None):
+    """Marks a micro-batch's URLs as done once its auctions are in the processed bucket."""
+    write_json(s3_client, bucket, batch_key(prefix, LOADED_DIR, batch_id), {
+        "urls": urls,
+        "uploaded_objects": uploaded_objects,
+        "ended_urls": ended_urls or [],
+    })
+
+
+def clear_checkpoint(s3_client, bucket:str, prefix:str):
+    """Deletes every object of a finished run's checkpoint (including shard objects, see shards.py)."""
+    keys = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/"):
+        keys.extend(obj['Key'] for obj in page.get('Contents', []))
+
+    # delete_objects takes at most 1000 keys per request
+    for start in range(0, len(keys), 1000):
+        s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]], 'Quiet': True}
+        )
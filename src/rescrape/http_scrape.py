@@ -0,0 +1,71 @@
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from setup import random_user_agent
+from scrape_auction import parse_auction_html
+
+HTTP_TIMEOUT = int(os.getenv('HTTP_TIMEOUT', 15))
+HTTP_MAX_RETRIES = 2
+HTTP_RETRY_BACKOFF = 0.5
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def http_session(pool_size:int = 4) -> requests.Session:
+    """
+    Session with a connection pool sized for `pool_size` concurrent workers, retries with
+    backoff on throttling/5xx responses and browser-like headers.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=HTTP_MAX_RETRIES, backoff_factor=HTTP_RETRY_BACKOFF, status_forcelist=RETRYABLE_STATUS_CODES),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": random_user_agent(),
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+    })
+    return session
+
+
+def is_complete(auction_data:dict) -> bool:
+    """
+    True if the parsed page has everything the browser path would add: the required stats block
+    (the parser stops at the first missing required element), the quick facts and, since the
+    bid history filter can't be clicked without a browser, exactly `bid_count` bids in the thread.
+    """
+    stats = auction_data['auction_stats']
+    return (
+        auction_data['auction_title'] is not None
+        and stats['seller_username'] is not None
+        and auction_data['auction_quick_facts']['Make'] is not None
+        and stats['bid_count'] is not None
+        and len(stats['bids']) == stats['bid_count']
+    )
+
+
+def scrape_auction_http(session:requests.Session, url:str) -> dict | None:
+    """
+    Fetches an auction page without a browser and parses it with `parse_auction_html`.
+
+    Returns:
+        dict | None: The auction dict if the server-rendered page is complete (see `is_complete`),
+        None if the page must be scraped with Selenium instead
+    """
+    try:
+        response = session.get(url, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"HTTP fetch failed for {url}: {e}")
+        return None
+
+    # missing sections are expected here (they may be rendered client-side), keep the parser quiet
+    auction_data = parse_auction_html(response.text, url, quiet=True)
+
+    return auction_data if is_complete(auction_data) else None
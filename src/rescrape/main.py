@@ -1,22 +1,32 @@
 import os
 import json
-import setup 
 import boto3
 import sys
-import scrape_auction
-import transform_load
+import worker_pool
+import checkpoint
+import shards
+import scrape_cache
+import pandas as pd
+import auction_transform
+from auction_transform import compression
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# URLs scraped, checkpointed, transformed & loaded together
+RESCRAPE_BATCH_SIZE = int(os.getenv('RESCRAPE_BATCH_SIZE', 50))
+# times the aggregate job re-runs a shard whose job failed before giving up on the run
+SHARD_RETRIES = int(os.getenv('SHARD_RETRIES', 1))
 
-def read_txt_from_s3(s3_client, bucket_name: str, key: str) -> list[str]:
+
+def read_txt_from_s3(s3_client, bucket_name: str, key: str, strict: bool = False) -> list[str]:
     """
     Reads a .txt file from S3 and returns a list of lines.
 
     Parameters:
     - bucket_name (str): The name of the S3 bucket.
     - key (str): The key (path) of the .txt file in the bucket.
+    - strict (bool): Raise if the file is missing or can't be read, instead of returning an empty list.
 
     Returns:
     - list of str: Each line from the file as a string (with trailing newline removed).
@@ -24,7 +34,7 @@ def read_txt_from_s3(s3_client, bucket_name: str, key: str) -> list[str]:
     
     try:
         response = s3_client.get_object(Bucket=bucket_name, Key=key)
-        content = response['Body'].read().decode('utf-8')
+        content = compression.read_body(response).decode('utf-8')
         
         # Split into lines and strip extra whitespace
         lines = [line.strip() for line in content.splitlines() if line.strip()]
@@ -32,9 +42,13 @@ def read_txt_from_s3(s3_client, bucket_name: str, key: str) -> list[str]:
     
     except s3_client.exceptions.NoSuchKey:
         print(f"File not found: s3://{bucket_name}/{key}")
+        if strict:
+            raise
         return []
     except Exception as e:
         print(f"Error reading file from S3: {e}")
+        if strict:
+            raise
         return []
 
 
@@ -80,46 +94,140 @@ def send_task_failure(sfn_client, task_token, error, cause):
     except Exception as e:
         print("Failed to send failure callback:", e)
         sys.exit(1)
-        
-def rescrape(s3_client, sfn_client, processed_auctions_bucket:str, urls:list, task_token:str):
 
-    driver = None
-    auctions_data = []
 
+
+def transform_auction_data(raw_data) -> pd.DataFrame:
+    # flatten raw data into schema columns
+    columns = auction_transform.flatten_auctions(raw_data)
+
+    # create auction df
+    df = auction_transform.create_auction_df(columns)
+
+    # extract valid auctions
+    valid_df = auction_transform.extract_invalid_auctions(df)[0]
+
+    # clean and transform data
+    cleaned_transformed_df = auction_transform.clean_and_transform(valid_df)
+    return cleaned_transformed_df
+
+
+def transform_and_load_batch(s3_client, processed_auctions_bucket:str, auctions_data:list, storage_mode:str, file_format:str) -> tuple:
+    """
+    Transforms one micro-batch of scraped auctions and loads it to the processed bucket.
+
+    Returns:
+        tuple: (uploaded object keys, URLs of the loaded auctions, i.e. the ones that have ended)
+    """
+    transformed_df = transform_auction_data(auctions_data)
+    if transformed_df.empty:
+        print("No valid auctions in batch, nothing to load")
+        return [], []
+
+    ended_urls = transformed_df['auction_url'].tolist()
+    return auction_transform.load_to_s3(s3_client, processed_auctions_bucket, transformed_df, storage_mode, file_format), ended_urls
+
+
+def run_batches(s3_client, processed_auctions_bucket:str, urls:list, storage_mode:str = 'merge', file_format:str = 'ndjson',
+                scrape_workers:int = 4, pages_per_driver:int = 25, checkpoint_bucket:str = None, checkpoint_prefix:str = None,
+                batch_size:int = RESCRAPE_BATCH_SIZE, load:bool = True, cache:dict = None) -> tuple:
+    """
+    Scrapes, transforms and loads `urls` in micro-batches of `batch_size`.
+
+    With a checkpoint location, every batch is saved to S3 right after scraping and marked as loaded once
+    it is in the processed bucket. A restarted run over the same URL file loads any scraped-but-unloaded
+    batches, skips the URLs already loaded and only scrapes the rest.
+
+    With load=False (shard jobs, see `rescrape_shard`) batches are only scraped and checkpointed; URLs in
+    scraped batches count as done and loading is left to `aggregate_shards`.
+
+    URLs with a valid entry in `cache` (see scrape_cache.py) are not scraped again.
+
+    Returns:
+        tuple: (processed object keys uploaded by the loaded batches without duplicates,
+                URLs of the loaded auctions, see `report_ended_auctions`)
+    """
+    use_checkpoint = bool(checkpoint_bucket and checkpoint_prefix)
+    if not load and not use_checkpoint:
+        raise ValueError("Scraping without loading needs a checkpoint location")
+
+    # pick up where an interrupted run of the same URL file stopped
+    if use_checkpoint:
+        state = checkpoint.load_checkpoint(s3_client, checkpoint_bucket, checkpoint_prefix)
+    else:
+        state = {"completed_urls": set(), "uploaded_objects": [], "ended_urls": [], "unloaded_batches": [], "next_batch_id": 0}
+    uploaded_objects_keys = list(state["uploaded_objects"])
+    ended_urls = list(state["ended_urls"])
+    batch_id = state["next_batch_id"]
+
+    # load batches that were scraped before the restart
+    for unloaded_id, batch in state["unloaded_batches"]:
+        if load:
+            print(f"Loading checkpointed batch {unloaded_id} ({len(batch['urls'])} URLs)...")
+            batch_keys, batch_ended_urls = transform_and_load_batch(s3_client, processed_auctions_bucket, batch["auctions"], storage_mode, file_format)
+            checkpoint.save_loaded_batch(s3_client, checkpoint_bucket, checkpoint_prefix, unloaded_id, batch["urls"], batch_keys, batch_ended_urls)
+            uploaded_objects_keys.extend(batch_keys)
+            ended_urls.extend(batch_ended_urls)
+        state["completed_urls"].update(batch["urls"])
+
+    remaining_urls = [url for url in urls if url not in state["completed_urls"]]
+    print(f"{len(urls) - len(remaining_urls)} of {len(urls)} URLs already done, {len(remaining_urls)} to scrape")
+
+    for start in range(0, len(remaining_urls), batch_size):
+        batch_urls = remaining_urls[start:start + batch_size]
+
+        # scrape auction data for each URL with a pool of drivers (results keep the order of urls)
+        print(f"Scraping batch {batch_id}: {len(batch_urls)} URLs with {scrape_workers} workers...")
+        auctions_data = worker_pool.scrape_urls(batch_urls, scrape_workers, pages_per_driver, cache=cache)
+        if use_checkpoint:
+            checkpoint.save_scraped_batch(s3_client, checkpoint_bucket, checkpoint_prefix, batch_id, batch_urls, auctions_data)
+
+        if load:
+            # transform & load transformed data to s3 processed auctions bucket
+            print(f"Cleaning, transforming & loading batch {batch_id}...")
+            batch_keys, batch_ended_urls = transform_and_load_batch(s3_client, processed_auctions_bucket, auctions_data, storage_mode, file_format)
+            if use_checkpoint:
+                checkpoint.save_loaded_batch(s3_client, checkpoint_bucket, checkpoint_prefix, batch_id, batch_urls, batch_keys, batch_ended_urls)
+            uploaded_objects_keys.extend(batch_keys)
+            ended_urls.extend(batch_ended_urls)
+
+        batch_id += 1
+
+    # a day touched by several batches is reported once
+    return list(dict.fromkeys(uploaded_objects_keys)), ended_urls
+
+
+def report_ended_auctions(s3_client, urls_bucket:str, urls_obj_key:str, ended_urls:list):
+    """
+    Writes the URLs of auctions that were loaded (i.e. have ended) next to the rescrape URL file, as
+    `{urls dir}/completed/{urls file name}`. write_rescrape_urls_lambda merges these reports into its
+    queue index and stops scheduling those auctions.
+    """
+    if not urls_bucket or not urls_obj_key or not ended_urls:
+        return
+
+    urls_dir, urls_file = os.path.split(urls_obj_key)
+    report_key = f"{urls_dir}/completed/{urls_file}" if urls_dir else f"completed/{urls_file}"
     try:
-        # initialize the driver
-        print("Setting up the driver...")
-        driver = setup.driver_setup()
-
-        # scrape auction data for each URL
-        print("Scraping auction data...")
-        for url in urls:
-            auction_data = scrape_auction.scrape_auction_data(driver, url)
-            auctions_data.append(auction_data)
-
-        # transform 
-        print("Cleaning & Transforming auction data...")
-        def transform_auction_data(raw_data):
-            # reshape raw data
-            data = transform_load.convert_to_list_dicts(raw_data)
-
-            # create auction df
-            df = transform_load.create_auction_df(data)
-
-            # extract valid auctions
-            valid_df = transform_load.extract_invalid_auctions(df)[0]
-
-           # clean and transform data
-            cleaned_transformed_df = transform_load.clean_and_transform(valid_df)
-            return cleaned_transformed_df
-        
-        transformed_df = transform_auction_data(auctions_data)
-        transformed_df.to_json("transformed_auction_data.json", orient="records", indent=3)
+        compression.put_object(s3_client, urls_bucket, report_key, "\n".join(ended_urls).encode('utf-8'), 'text/plain')
+        print(f"Reported {len(ended_urls)} ended auctions to s3://{urls_bucket}/{report_key}")
+    except Exception as e:
+        # the queue re-checks unreported auctions later, don't fail the run over it
+        print(f"Error reporting ended auctions: {e}")
 
-        # load transformed data to s3 processed auctions bucket
-        print("Loading transformed data to S3...")
-        uploaded_objects_keys = transform_load.load_to_s3(s3_client, processed_auctions_bucket, transformed_df)
 
+def rescrape(s3_client, sfn_client, processed_auctions_bucket:str, urls:list, task_token:str, storage_mode:str = 'merge', file_format:str = 'ndjson',
+             scrape_workers:int = 4, pages_per_driver:int = 25, checkpoint_bucket:str = None, checkpoint_prefix:str = None,
+             batch_size:int = RESCRAPE_BATCH_SIZE, cache:dict = None, urls_bucket:str = None, urls_obj_key:str = None):
+    """
+    Rescrapes `urls` in a single job (see `run_batches`) and reports the uploaded objects to the
+    Step Functions task. The checkpoint is deleted on success.
+    """
+    try:
+        uploaded_objects_keys, ended_urls = run_batches(s3_client, processed_auctions_bucket, urls, storage_mode, file_format, scrape_workers,
+                                            pages_per_driver, checkpoint_bucket, checkpoint_prefix, batch_size, cache=cache)
+        # append mode parts compacted by a later batch (or run) resolve to the part holding their records now
+        uploaded_objects_keys = auction_transform.resolve_part_keys(s3_client, processed_auctions_bucket, uploaded_objects_keys)
         print("Data loaded successfully. Uploaded objects keys:", uploaded_objects_keys)
 
         # send task success
@@ -127,6 +235,12 @@ def rescrape(s3_client, sfn_client, processed_auctions_bucket:str, urls:list, ta
             "bucket": processed_auctions_bucket,
             "uploaded_objects": uploaded_objects_keys,
         })
+
+        # only once the load Lambda has the keys, so failed runs leave the auctions queued
+        report_ended_auctions(s3_client, urls_bucket, urls_obj_key, ended_urls)
+
+        if checkpoint_bucket and checkpoint_prefix:
+            checkpoint.clear_checkpoint(s3_client, checkpoint_bucket, checkpoint_prefix)
         
     
     except Exception as e:
@@ -134,10 +248,100 @@ def rescrape(s3_client, sfn_client, processed_auctions_bucket:str, urls:list, ta
 
         # send task failure
         send_task_failure(sfn_client, task_token, "RescrapePipelineError", str(e))
-    
-    finally:
-        if driver:
-            setup.driver_teardown(driver)
+
+
+def rescrape_shard(s3_client, checkpoint_bucket:str, run_prefix:str, shard_index:int, scrape_workers:int = 4,
+                   pages_per_driver:int = 25, batch_size:int = RESCRAPE_BATCH_SIZE, cache:dict = None) -> bool:
+    """
+    Scrapes one shard of a sharded run into its checkpoint and records the shard's result for
+    `aggregate_shards`. Nothing is loaded here: shards would otherwise race on the same day files.
+
+    Returns:
+        bool: True if the whole shard was scraped
+    """
+    try:
+        # an unreadable shard has to fail the shard, not record it as scraped with no URLs
+        urls = read_txt_from_s3(s3_client, checkpoint_bucket, shards.shard_urls_key(run_prefix, shard_index), strict=True)
+        run_batches(s3_client, None, urls, scrape_workers=scrape_workers, pages_per_driver=pages_per_driver,
+                    checkpoint_bucket=checkpoint_bucket, checkpoint_prefix=shards.shard_checkpoint_prefix(run_prefix, shard_index),
+                    batch_size=batch_size, load=False, cache=cache)
+        shards.write_shard_result(s3_client, checkpoint_bucket, run_prefix, shard_index, {"status": "ok", "url_count": len(urls)})
+        return True
+
+    except Exception as e:
+        print(f"Rescrape Shard {shard_index} Error: {e}")
+        shards.write_shard_result(s3_client, checkpoint_bucket, run_prefix, shard_index, {"status": "error", "error": str(e)})
+        return False
+
+
+def aggregate_shards(s3_client, sfn_client, processed_auctions_bucket:str, task_token:str, checkpoint_bucket:str, run_prefix:str,
+                     storage_mode:str = 'merge', file_format:str = 'ndjson', urls_bucket:str = None, urls_obj_key:str = None,
+                     shard_retries:int = SHARD_RETRIES, scrape_workers:int = 4, pages_per_driver:int = 25, cache:dict = None) -> bool:
+    """
+    Loads the scraped batches of every shard, one shard after another, and sends a single task
+    success with the merged uploaded objects.
+
+    Shards that did not finish are first re-run here, up to `shard_retries` times each (they resume
+    from their checkpoints and only scrape what is left). If a shard still fails, the batches every
+    shard scraped are loaded anyway and a single task failure naming the failed shards is sent.
+
+    Returns:
+        bool: True if the task success was sent
+    """
+    try:
+        shard_count = shards.read_shard_count(s3_client, checkpoint_bucket, run_prefix)
+        if not shard_count:
+            raise RuntimeError(f"No shards found under s3://{checkpoint_bucket}/{run_prefix}")
+
+        uploaded_objects_keys = []
+        ended_urls = []
+        failed_shards = []
+        for shard_index in range(shard_count):
+            result = shards.read_shard_result(s3_client, checkpoint_bucket, run_prefix, shard_index)
+            for attempt in range(shard_retries):
+                if result is not None and result["status"] == "ok":
+                    break
+                print(f"Re-running {shards.shard_name(shard_index)} (attempt {attempt + 1} of {shard_retries})...")
+                rescrape_shard(s3_client, checkpoint_bucket, run_prefix, shard_index, scrape_workers, pages_per_driver, cache=cache)
+                result = shards.read_shard_result(s3_client, checkpoint_bucket, run_prefix, shard_index)
+
+            if result is None or result["status"] != "ok":
+                failed_shards.append(f"{shards.shard_name(shard_index)}: {result['error'] if result else 'did not finish'}")
+
+            print(f"Loading {shards.shard_name(shard_index)}...")
+            shard_keys, shard_ended_urls = run_batches(
+                s3_client, processed_auctions_bucket, [], storage_mode, file_format,
+                checkpoint_bucket=checkpoint_bucket, checkpoint_prefix=shards.shard_checkpoint_prefix(run_prefix, shard_index)
+            )
+            uploaded_objects_keys.extend(shard_keys)
+            ended_urls.extend(shard_ended_urls)
+
+        if failed_shards:
+            raise RuntimeError(f"{len(failed_shards)} of {shard_count} shards failed: {'; '.join(failed_shards)}")
+
+        # a day touched by several shards is reported once, append mode parts compacted by a later
+        # shard resolve to the part holding their records now
+        uploaded_objects_keys = auction_transform.resolve_part_keys(s3_client, processed_auctions_bucket, uploaded_objects_keys)
+        print("Data loaded successfully. Uploaded objects keys:", uploaded_objects_keys)
+
+        # send task success
+        send_task_success(sfn_client, task_token, {
+            "bucket": processed_auctions_bucket,
+            "uploaded_objects": uploaded_objects_keys,
+        })
+
+        # only once the load Lambda has the keys, so failed runs leave the auctions queued
+        report_ended_auctions(s3_client, urls_bucket, urls_obj_key, ended_urls)
+
+        checkpoint.clear_checkpoint(s3_client, checkpoint_bucket, run_prefix)
+        return True
+
+    except Exception as e:
+        print(f"Rescrape Pipeline Error: {e}")
+
+        # send task failure
+        send_task_failure(sfn_client, task_token, "RescrapePipelineError", str(e))
+        return False
 
 
 # urls = [
@@ -148,20 +352,60 @@ def rescrape(s3_client, sfn_client, processed_auctions_bucket:str, urls:list, ta
 
 print("AWS_REGION:", os.getenv('AWS_DEFAULT_REGION'))
 
-s3_client = boto3.client('s3')
+s3_client = boto3.client('s3', config=auction_transform.S3_CLIENT_CONFIG)
 sfn_client = boto3.client('stepfunctions')
 processed_auctions_bucket = os.getenv('PROCESSED_AUCTIONS_BUCKET')
 raw_auctions_bucket = os.getenv('RAW_AUCTIONS_BUCKET')
 rescrape_bucket_dir = os.getenv('RESCRAPE_BUCKET_DIR')
 urls_bucket = os.getenv('URLS_BUCKET')
+storage_mode = os.getenv('PROCESSED_STORAGE_MODE', 'merge')
+file_format = os.getenv('PROCESSED_FILE_FORMAT', 'ndjson')
+scrape_workers = int(os.getenv('SCRAPE_WORKERS', 4))
+pages_per_driver = int(os.getenv('PAGES_PER_DRIVER', 25))
+# micro-batch checkpoints go under the rescrape dir of the raw auctions bucket
+checkpoint_bucket = os.getenv('CHECKPOINT_BUCKET', raw_auctions_bucket)
+
+
+# 'full' runs the whole URL file in this job; a sharded run is 'split' -> one 'shard' job per shard -> 'aggregate'
+rescrape_stage = os.getenv('RESCRAPE_STAGE', 'full')
+shard_count = int(os.getenv('SHARD_COUNT', 4))
+# parsed pages cached by auction ID, on disk and in S3 (shared by shard jobs and later runs)
+use_scrape_cache = os.getenv('SCRAPE_CACHE', 'true').lower() == 'true'
+scrape_cache_bucket = os.getenv('SCRAPE_CACHE_BUCKET', raw_auctions_bucket)
 
 
 rescrape_obj_path = "/tmp/rescrape/rescrape_object.txt"
 task_token_path = "/tmp/rescrape/task_token.txt"
 
-task_token = read_inputs(task_token_path)
 obj_key = read_inputs(rescrape_obj_path)
+run_prefix = checkpoint.checkpoint_prefix(rescrape_bucket_dir, obj_key)
+cache = None
+if use_scrape_cache:
+    cache_prefix = '/'.join(part.strip('/') for part in (rescrape_bucket_dir or '', 'scrape-cache') if part)
+    cache = scrape_cache.scrape_cache(s3_client=s3_client, bucket=scrape_cache_bucket, prefix=cache_prefix)
+
+if rescrape_stage == 'full':
+    task_token = read_inputs(task_token_path)
+    urls = read_txt_from_s3(s3_client, urls_bucket, obj_key)
+    rescrape(s3_client, sfn_client, processed_auctions_bucket, urls, task_token, storage_mode, file_format, scrape_workers, pages_per_driver,
+             checkpoint_bucket, run_prefix, cache=cache, urls_bucket=urls_bucket, urls_obj_key=obj_key)
+
+elif rescrape_stage == 'split':
+    urls = read_txt_from_s3(s3_client, urls_bucket, obj_key, strict=True)
+    written_shards = shards.write_shards(s3_client, checkpoint_bucket, run_prefix, urls, shard_count)
+    shards.write_github_output("shards", list(range(written_shards)))
+
+elif rescrape_stage == 'shard':
+    shard_index = int(os.getenv('SHARD_INDEX'))
+    if not rescrape_shard(s3_client, checkpoint_bucket, run_prefix, shard_index, scrape_workers, pages_per_driver, cache=cache):
+        sys.exit(1)
 
-urls = read_txt_from_s3(s3_client, urls_bucket, obj_key)
-rescrape(s3_client, sfn_client, processed_auctions_bucket, urls, task_token)
+elif rescrape_stage == 'aggregate':
+    task_token = read_inputs(task_token_path)
+    if not aggregate_shards(s3_client, sfn_client, processed_auctions_bucket, task_token, checkpoint_bucket, run_prefix, storage_mode,
+                            file_format, urls_bucket, obj_key, scrape_workers=scrape_workers, pages_per_driver=pages_per_driver,
+                            cache=cache):
+        sys.exit(1)
 
+else:
+    raise ValueError(f"Unknown RESCRAPE_STAGE: {rescrape_stage}")
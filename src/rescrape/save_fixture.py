@@ -0,0 +1,60 @@
+"""
+Saves a live auction page as a parser fixture for benchmark_parse.py and the tests:
+
+- fixtures/<name>.html: the rendered page source once the bid history is open, as
+  `scrape_auction_html` parses it
+- fixtures/<name>.json: the expected output, from the per-element WebDriver extraction of the
+  same page, so the page_source parser is checked against an independent extraction
+
+    uv run src/rescrape/save_fixture.py https://carsandbids.com/auctions/<id>/<slug> sold
+    uv run src/rescrape/save_fixture.py https://carsandbids.com/auctions/<id>/<slug> no_bids --profile lean
+
+After saving, `benchmark_transform.py --update-golden` regenerates fixtures/transformed.json,
+which is built from every fixture's expected output.
+"""
+import os
+import sys
+import json
+import argparse
+
+import setup
+from scrape_auction import scrape_auction_data, parse_auction_html
+from benchmark_parse import FIXTURES_DIR, FIXTURE_URL
+
+
+def save_fixture(url:str, name:str, profile:str = 'full') -> bool:
+    """
+    Returns:
+        bool: True if the page_source parser matches the WebDriver extraction on the saved page
+    """
+    driver = setup.driver_setup(profile)
+    try:
+        expected = scrape_auction_data(driver, url, extraction='webdriver')
+        html = driver.page_source
+    finally:
+        setup.driver_teardown(driver)
+
+    # fixtures are parsed under FIXTURE_URL, see benchmark_parse.py
+    expected['auction_url'] = FIXTURE_URL.format(name=name)
+    html_path = os.path.join(FIXTURES_DIR, f"{name}.html")
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+        f.write(json.dumps(expected, indent=3))
+    print(f"Saved {html_path} ({len(html.encode('utf-8')) / 1024:.0f} KB)")
+
+    matches = parse_auction_html(html, expected['auction_url'], quiet=True) == expected
+    if not matches:
+        print(f"{name}: the page_source parser's output differs from the WebDriver extraction")
+    return matches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Save an auction page and its expected parser output as a fixture")
+    parser.add_argument("url", help="auction page URL")
+    parser.add_argument("name", help="fixture name, e.g. sold, reserve_not_met, live, no_bids")
+    parser.add_argument("--profile", choices=['full', 'lean'], default='full', help="driver profile the page is loaded with")
+    args = parser.parse_args()
+
+    if not save_fixture(args.url, args.name, args.profile):
+        sys.exit(1)
@@ -2,31 +2,67 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import time
-import csv
-from datetime import datetime
 import os
-import json
+import re
+from bs4 import BeautifulSoup, NavigableString
+from bs4.element import PreformattedString
 
 from setup import close_promo_bar
 
+# 'html' reads page_source once and parses it offline; 'webdriver' queries every element through chromedriver
+SCRAPE_EXTRACTION = os.getenv('SCRAPE_EXTRACTION', 'html')
+# wait budgets (seconds) for the bid history stage: the filter button, the first thread update
+# after clicking it, the quiet period that marks the update as finished, and the whole stage.
+# Auctions with bids are waited on until at least one bid is in the thread, whatever the start timeout.
+BID_BUTTON_TIMEOUT = 10
+BID_HISTORY_START_TIMEOUT = float(os.getenv('BID_HISTORY_START_TIMEOUT', 2.0))
+BID_HISTORY_QUIET_PERIOD = float(os.getenv('BID_HISTORY_QUIET_PERIOD', 0.3))
+BID_HISTORY_TIMEOUT = float(os.getenv('BID_HISTORY_TIMEOUT', 5.0))
 
-def scrape_auction_data(driver, url:str, timeout:int = 30) -> dict:
-    """
-    Scrapes detailed information from a single auction page.
-    
-    Args:
-        url: URL of the auction page
-        driver: Selenium WebDriver instance
-        timeout: Maximum wait time for elements
-        
-    Returns:
-        Dictionary containing all scraped auction details
-    """
-    driver.get(url)
-    close_promo_bar(driver)
+# records when the comment thread last changed, so waits can end as soon as it settles
+WATCH_THREAD_SCRIPT = """
+window.__threadChangedAt = null;
+window.__threadWatchStartedAt = performance.now();
+const target = document.querySelector('.comments') || document.body;
+if (window.__threadObserver) { window.__threadObserver.disconnect(); }
+window.__threadObserver = new MutationObserver(() => { window.__threadChangedAt = performance.now(); });
+window.__threadObserver.observe(target, {childList: true, subtree: true, characterData: true});
+"""
+THREAD_STATE_SCRIPT = """
+const now = performance.now();
+return {
+    changed: window.__threadChangedAt !== null,
+    quiet_ms: window.__threadChangedAt === null ? null : now - window.__threadChangedAt,
+    elapsed_ms: now - window.__threadWatchStartedAt,
+    bids: document.querySelectorAll('.thread li.bid').length,
+};
+"""
+# the "Bids" stat of the page, 0 if it has none
+BID_COUNT_SCRIPT = """
+for (const item of document.querySelectorAll('ul.stats li:not(.seller)')) {
+    const label = item.querySelector('.th');
+    const value = item.querySelector('.td');
+    if (label && value && label.textContent.trim() === 'Bids') {
+        return parseInt(value.textContent.replace(/,/g, ''), 10) || 0;
+    }
+}
+return 0;
+"""
+
+# BeautifulSoup tree builder for parse_auction_html ('lxml' is faster when installed)
+HTML_PARSER = os.getenv('HTML_PARSER', 'html.parser')
+# elements rendered as blocks by default (their text starts a new line in `.text`), and elements never rendered
+BLOCK_ELEMENTS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'details', 'dialog', 'dd', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hgroup', 'hr',
+    'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'summary', 'table', 'tr', 'ul',
+))
+HIDDEN_ELEMENTS = frozenset(('head', 'script', 'style', 'template', 'noscript'))
 
-    auction_data = {
+
+def empty_auction_data(url:str) -> dict:
+    """Returns the auction dict with every field unset, as returned for a page that fails to load."""
+    return {
         'auction_url': url,
         'auction_title': None,
         'auction_subtitle': None,
@@ -75,6 +111,28 @@ def scrape_auction_data(driver, url:str, timeout:int = 30) -> dict:
         'auction_videos': []
     }
 
+
+def scrape_auction_data(driver, url:str, timeout:int = 30, extraction:str = SCRAPE_EXTRACTION) -> dict:
+    """
+    Scrapes detailed information from a single auction page.
+    
+    Args:
+        url: URL of the auction page
+        driver: Selenium WebDriver instance
+        timeout: Maximum wait time for elements
+        extraction: 'html' to parse the page source in one pass, 'webdriver' for per-element lookups
+        
+    Returns:
+        Dictionary containing all scraped auction details
+    """
+    if extraction == 'html':
+        return scrape_auction_html(driver, url, timeout)
+
+    driver.get(url)
+    close_promo_bar(driver)
+
+    auction_data = empty_auction_data(url)
+
     try:
         # Wait for main content to load
         WebDriverWait(driver, timeout).until(
@@ -90,7 +148,8 @@ def scrape_auction_data(driver, url:str, timeout:int = 30) -> dict:
         
         # Extract reserve status
         reserve_element = driver.find_element(By.CSS_SELECTOR, "#auction-jump h3 span")
-        auction_data['auction_stats']['reserve_status'] = 'Reserve' if 'Reserve' in reserve_element.text else 'No Reserve'
+        # 'No Reserve' contains 'Reserve', check it first
+        auction_data['auction_stats']['reserve_status'] = 'No Reserve' if 'No Reserve' in reserve_element.text else 'Reserve'
         
         # Extract auction status and final bid
         status_container = driver.find_element(By.CSS_SELECTOR, ".current-bid.ended")
@@ -284,11 +343,7 @@ def scrape_auction_data(driver, url:str, timeout:int = 30) -> dict:
             
             # Click Bid History filter button
             try:
-                bid_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, "button[data-filter='4'][data-ga='bids']"))
-                )
-                driver.execute_script("arguments[0].click();", bid_button)
-                time.sleep(2)  # Allow bids to load
+                open_bid_history(driver)
             except Exception as e:
                 print(f"Couldn't click bid history button: {str(e)}")
                 return auction_data
@@ -321,4 +376,303 @@ def scrape_auction_data(driver, url:str, timeout:int = 30) -> dict:
     except Exception as e:
         print(f"Error scraping {url}: {str(e)}")
     
-    return auction_data
\ No newline at end of file
+    return auction_data
+
+
+def element_text(element) -> str:
+    """
+    Text of a BeautifulSoup element as Selenium's `.text` renders it: block elements start a new line
+    (unless the current one is still empty), every <br> ends a line, whitespace runs within a line
+    collapse to one space and lines are stripped. The line breaks matter downstream, e.g.
+    `clean_and_transform` keeps the first line of the model and seller to drop "Save"/"Follow".
+    """
+    lines = ['']
+
+    def new_line(always:bool):
+        if always or lines[-1].strip():
+            lines.append('')
+
+    def walk(node):
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                if not isinstance(child, PreformattedString):  # comments, CDATA, doctype
+                    lines[-1] += child
+            elif child.name == 'br':
+                new_line(always=True)
+            elif child.name in BLOCK_ELEMENTS:
+                new_line(always=False)
+                walk(child)
+                new_line(always=False)
+            elif child.name not in HIDDEN_ELEMENTS:
+                walk(child)
+
+    walk(element)
+    return '\n'.join(re.sub(r'\s+', ' ', line).strip() for line in lines).strip('\n')
+
+
+def select_required(parent, selector:str):
+    """`select_one` that raises NoSuchElementException like `find_element` when nothing matches."""
+    element = parent.select_one(selector)
+    if element is None:
+        raise NoSuchElementException(f"Unable to locate element: {selector}")
+    return element
+
+
+def parse_auction_html(html:str, url:str = None, include_bids:bool = True, parser:str = None, quiet:bool = False) -> dict:
+    """
+    Parses a rendered auction page into the same dict `scrape_auction_data` builds with per-element
+    WebDriver lookups. Sections are extracted in the same order and with the same fallbacks, so a
+    missing required element leaves the remaining fields unset exactly as the WebDriver path does.
+
+    Args:
+        html: Page source of the auction page
+        url: URL of the auction page
+        include_bids: Whether the bid history filter was applied, i.e. `.thread li.bid` holds the bids
+        parser: BeautifulSoup tree builder, defaults to HTML_PARSER
+        quiet: Don't print missing sections (thread-safe alternative to redirecting stdout)
+
+    Returns:
+        Dictionary containing all scraped auction details
+    """
+    log = (lambda *args: None) if quiet else print
+    auction_data = empty_auction_data(url)
+    soup = BeautifulSoup(html, parser or HTML_PARSER)
+
+    try:
+        # title & subtitle
+        auction_data['auction_title'] = element_text(select_required(soup, ".auction-title h1"))
+        auction_data['auction_subtitle'] = element_text(select_required(soup, ".d-md-flex.justify-content-between.flex-wrap h2"))
+
+        # reserve status
+        reserve_element = select_required(soup, "#auction-jump h3 span")
+        auction_data['auction_stats']['reserve_status'] = 'No Reserve' if 'No Reserve' in element_text(reserve_element) else 'Reserve'
+
+        # auction status and final bid
+        status_container = select_required(soup, ".current-bid.ended")
+        if 'cancelled' in ' '.join(status_container.get('class', [])):
+            auction_data['auction_stats']['auction_status'] = 'Canceled'
+        else:
+            status_header = element_text(select_required(status_container, "h4"))
+            if 'Sold to' in status_header:
+                auction_data['auction_stats']['auction_status'] = 'Sold'
+                auction_data['auction_stats']['buyer_username'] = element_text(select_required(status_container, ".username .user"))
+            elif 'Reserve not met' in status_header:
+                auction_data['auction_stats']['auction_status'] = 'Reserve Not Met'
+
+            bid_value = element_text(select_required(status_container, ".bid-value"))
+            auction_data['auction_stats']['highest_bid_value'] = bid_value.replace('$', '').strip()
+
+        # stats
+        stats_section = select_required(soup, "ul.stats")
+        auction_data['auction_stats']['seller_username'] = element_text(select_required(stats_section, "li.seller .user"))
+
+        for item in stats_section.select("li:not(.seller)"):
+            label = element_text(select_required(item, ".th"))
+            value = element_text(select_required(item, ".td"))
+
+            if label == "Ended":
+                auction_data['auction_stats']['auction_date'] = value
+            elif label == "Bids":
+                auction_data['auction_stats']['bid_count'] = int(value.replace(',', ''))
+            elif label == "Views":
+                auction_data['auction_stats']['view_count'] = int(value.replace(',', ''))
+            elif label == "Watching":
+                auction_data['auction_stats']['watcher_count'] = int(value.replace(',', ''))
+
+        # quick facts: dt labels mapped to their following dd
+        try:
+            quick_facts = select_required(soup, ".quick-facts")
+            first_dl_fields = {
+                "make": "Make", "model": "Model", "mileage": "Mileage", "vin": "VIN",
+                "title_status": "Title Status", "location": "Location", "seller": "Seller",
+            }
+            second_dl_fields = {
+                "engine": "Engine", "drivetrain": "Drivetrain", "transmission": "Transmission",
+                "body_style": "Body Style", "exterior_color": "Exterior Color",
+                "interior_color": "Interior Color", "seller_type": "Seller Type",
+            }
+            dls = quick_facts.select("dl")
+            for i, fields in enumerate((first_dl_fields, second_dl_fields)):
+                for item in dls[i].select("dt"):
+                    label = element_text(item).lower().replace(" ", "_")
+                    dd = item.find_next_sibling("dd")
+                    if dd is None:
+                        raise NoSuchElementException("Unable to locate element: ./following-sibling::dd[1]")
+                    if label not in fields:
+                        continue
+
+                    if label in ("make", "model"):
+                        value = element_text(select_required(dd, "a"))
+                    elif label == "seller":
+                        value = element_text(select_required(dd, ".user"))
+                    else:
+                        value = element_text(dd)
+                    auction_data['auction_quick_facts'][fields[label]] = value
+
+        except NoSuchElementException:
+            log('Auction quick facts not found')
+        except Exception as e:
+            log(e)
+
+        # Doug's take
+        try:
+            dougs_section = select_required(soup, ".detail-section.dougs-take")
+            auction_data['dougs_take'] = element_text(select_required(dougs_section, ".detail-body p"))
+        except NoSuchElementException:
+            log("Doug's take not found")
+
+        # highlights
+        try:
+            highlights_section = select_required(soup, ".detail-section.detail-highlights")
+            highlights_body = select_required(highlights_section, ".detail-body")
+
+            description = highlights_body.select_one("p")
+            if description is not None:
+                auction_data['auction_highlights']['description'] = element_text(description)
+
+            bullet_points = [element_text(point) for point in highlights_body.select("ul li")]
+            auction_data['auction_highlights']['bullet_points'] = [point for point in bullet_points if point]
+        except NoSuchElementException:
+            log('Auction highlights not found')
+
+        # known flaws
+        try:
+            flaws_section = select_required(soup, ".detail-section.detail-known_flaws")
+            auction_data['known_flaws'] = [element_text(item) for item in flaws_section.select(".detail-body li")]
+        except NoSuchElementException:
+            log('Known flaws not found')
+
+        # service history
+        try:
+            service_section = select_required(soup, ".detail-section.detail-recent_service_history")
+            auction_data['service_history']['description'] = element_text(select_required(service_section, ".detail-body p"))
+            auction_data['service_history']['items'] = [element_text(item) for item in service_section.select(".detail-body li")]
+        except NoSuchElementException:
+            log('Service History not found')
+
+        # included items
+        try:
+            items_section = select_required(soup, ".detail-section.detail-other_items")
+            auction_data['included_items'] = [element_text(item) for item in items_section.select(".detail-body li")]
+        except NoSuchElementException:
+            log("Included items not found")
+
+        # ownership history
+        try:
+            history_section = select_required(soup, ".detail-section.detail-ownership_history")
+            auction_data['ownership_history'] = element_text(select_required(history_section, ".detail-body p"))
+        except NoSuchElementException:
+            log('Ownership history not found')
+
+        # seller notes
+        try:
+            notes_section = select_required(soup, ".detail-section.detail-seller_notes")
+            auction_data['seller_notes'] = [element_text(item) for item in notes_section.select(".detail-body li")]
+        except NoSuchElementException:
+            log('Seller notes not found')
+
+        # video ids from youtube preview images
+        try:
+            videos_section = select_required(soup, ".detail-section.detail-videos")
+            auction_data['auction_videos'] = [
+                img.get("src").split('/vi/')[1].split('/')[0]
+                for img in videos_section.select(".video-embed img.video-preview")
+                if 'ytimg.com' in img.get("src")
+            ]
+        except NoSuchElementException:
+            log('Auction videos not found')
+
+        # bids (only present once the bid history filter has been clicked)
+        if include_bids:
+            bids = []
+            for bid in soup.select(".thread li.bid"):
+                bid_value = bid.select_one(".bid-value")
+                if bid_value is None:
+                    log("Error parsing bid: .bid-value not found")
+                    continue
+                bids.append(element_text(bid_value).replace('$', '').replace(',', ''))
+            auction_data['auction_stats']['bids'] = bids
+
+    except Exception as e:
+        log(f"Error scraping {url}: {str(e)}")
+
+    return auction_data
+
+
+def scrape_auction_html(driver, url:str, timeout:int = 30) -> dict:
+    """
+    Loads an auction page, opens its bid history and parses the rendered page source in one pass
+    with `parse_auction_html`, instead of one chromedriver round trip per element.
+
+    The promo bar is not dismissed: it doesn't change the page source and the bid history
+    button is clicked through JavaScript.
+    """
+    driver.get(url)
+
+    try:
+        # Wait for main content to load
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, ".auction-title"))
+        )
+    except TimeoutException:
+        print(f"Timeout while scraping {url}")
+        return empty_auction_data(url)
+
+    # Wait for quick facts section to load
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, ".quick-facts"))
+        )
+    except Exception as e:
+        print(e)
+
+    # open the bid history
+    bids_loaded = False
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, ".comments"))
+        )
+        try:
+            open_bid_history(driver)
+            bids_loaded = True
+        except Exception as e:
+            print(f"Couldn't click bid history button: {str(e)}")
+    except Exception as e:
+        print(f"Error scraping bid history: {str(e)}")
+
+    return parse_auction_html(driver.page_source, url, include_bids=bids_loaded)
+
+
+def thread_settled(driver, start_timeout:float = BID_HISTORY_START_TIMEOUT, quiet_period:float = BID_HISTORY_QUIET_PERIOD,
+                   expect_bids:bool = False) -> bool:
+    """
+    WebDriverWait condition: True once the comment thread has changed and then stayed unchanged
+    for `quiet_period`, or if it hasn't changed at all within `start_timeout` (nothing to load).
+    With `expect_bids` it stays False until at least one bid is in the thread.
+    """
+    state = driver.execute_script(THREAD_STATE_SCRIPT)
+    if expect_bids and not state['bids']:
+        return False
+    if state['changed']:
+        return state['quiet_ms'] >= quiet_period * 1000
+    return state['elapsed_ms'] >= start_timeout * 1000
+
+
+def open_bid_history(driver, timeout:float = BID_HISTORY_TIMEOUT):
+    """
+    Clicks the Bid History filter and waits until the comment thread stops changing, instead of a fixed sleep.
+    A MutationObserver installed before the click timestamps every change to the thread; the wait ends
+    `BID_HISTORY_QUIET_PERIOD` after the last change, and never takes longer than `timeout`. For an auction
+    with bids it doesn't end before the first bid is in the thread, so a slow filter isn't read as no bids.
+    """
+    bid_button = WebDriverWait(driver, BID_BUTTON_TIMEOUT).until(
+        EC.element_to_be_clickable((By.CSS_SELECTOR, "button[data-filter='4'][data-ga='bids']"))
+    )
+    expect_bids = driver.execute_script(BID_COUNT_SCRIPT) > 0
+    driver.execute_script(WATCH_THREAD_SCRIPT)
+    driver.execute_script("arguments[0].click();", bid_button)
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(lambda driver: thread_settled(driver, expect_bids=expect_bids))
+    except TimeoutException:
+        print(f"Bid history still updating after {timeout}s, reading what has loaded")
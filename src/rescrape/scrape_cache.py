@@ -0,0 +1,192 @@
+import os
+import re
+import json
+import time
+import tempfile
+
+from auction_transform import compression
+
+
+# parsed auction dicts keyed by auction ID, on local disk with an optional S3 tier shared by all jobs:
+#   {cache_dir}/{auction_id}.json   and   s3://{bucket}/{prefix}/{auction_id}.json
+# holding {"version": 1, "cached_at": <epoch s>, "terminal": bool, "auction": {...}}
+SCRAPE_CACHE_DIR = os.getenv('SCRAPE_CACHE_DIR', os.path.expanduser('~/.cache/rescrape'))
+# seconds a live (non-terminal) auction is served from the cache before it is scraped again
+SCRAPE_CACHE_TTL = int(os.getenv('SCRAPE_CACHE_TTL', 3600))
+# local entries kept; the least recently used ones are evicted beyond this
+SCRAPE_CACHE_MAX_ENTRIES = int(os.getenv('SCRAPE_CACHE_MAX_ENTRIES', 5000))
+
+# ended auctions can't change any more and are cached forever
+TERMINAL_STATUSES = ('Sold', 'Reserve Not Met', 'Canceled')
+# bump when the parser output changes, so entries written by an older parser are scraped again
+# (2: entries of pages that loaded only partly are no longer written, see `is_complete`)
+CACHE_VERSION = 2
+AUCTION_ID_PATTERN = re.compile(r'/auctions/([^/?#]+)')
+
+
+def auction_id(url:str) -> str | None:
+    """Auction ID from an auction URL, e.g. '3vA7lPBv' for https://carsandbids.com/auctions/3vA7lPBv/2002-bmw-330i-sedan."""
+    match = AUCTION_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def is_terminal(auction_data:dict) -> bool:
+    return auction_data['auction_stats']['auction_status'] in TERMINAL_STATUSES
+
+
+def is_complete(auction_data:dict) -> bool:
+    """
+    True if the page was parsed in full: it loaded (has a title), its quick facts were found and,
+    for an auction with bids, its bid history was read. A failed quick facts wait or bid history
+    click leaves these unset.
+    """
+    stats = auction_data['auction_stats']
+    return (
+        auction_data['auction_title'] is not None
+        and any(value is not None for value in auction_data['auction_quick_facts'].values())
+        and (not stats['bid_count'] or len(stats['bids']) > 0)
+    )
+
+
+def scrape_cache(cache_dir:str = SCRAPE_CACHE_DIR, s3_client=None, bucket:str = None, prefix:str = None,
+                 ttl:int = SCRAPE_CACHE_TTL, max_entries:int = SCRAPE_CACHE_MAX_ENTRIES) -> dict:
+    """
+    Cache settings passed to `get_cached`/`put_cached`. Without `bucket` only the local tier is used.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    return {
+        "cache_dir": cache_dir,
+        "s3_client": s3_client if bucket else None,
+        "bucket": bucket,
+        "prefix": (prefix or '').strip('/'),
+        "ttl": ttl,
+        "max_entries": max_entries,
+    }
+
+
+def local_path(cache:dict, key:str) -> str:
+    return os.path.join(cache["cache_dir"], f"{key}.json")
+
+
+def s3_key(cache:dict, key:str) -> str:
+    return f"{cache['prefix']}/{key}.json" if cache["prefix"] else f"{key}.json"
+
+
+def is_valid(cache:dict, entry:dict) -> bool:
+    """True if the entry was written by the current parser and is terminal or younger than the TTL."""
+    return (
+        entry.get("version") == CACHE_VERSION
+        and (entry["terminal"] or time.time() - entry["cached_at"] < cache["ttl"])
+    )
+
+
+def read_local(cache:dict, key:str) -> dict | None:
+    try:
+        with open(local_path(cache, key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_local(cache:dict, key:str, entry:dict):
+    # write to a temp file and rename, so concurrent workers never read a partial entry
+    fd, tmp_path = tempfile.mkstemp(dir=cache["cache_dir"], suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, local_path(cache, key))
+
+
+def read_s3(cache:dict, key:str) -> dict | None:
+    s3_client = cache["s3_client"]
+    try:
+        response = s3_client.get_object(Bucket=cache["bucket"], Key=s3_key(cache, key))
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    return json.loads(compression.read_body(response))
+
+
+def get_cached(cache:dict, url:str) -> dict | None:
+    """
+    Returns the cached auction dict for `url`, or None if it must be scraped: no entry, an entry
+    from an older parser, or a live auction cached more than `ttl` seconds ago.
+
+    Local hits are touched so LRU eviction keeps them; S3 hits are copied to the local tier.
+    """
+    key = auction_id(url)
+    if key is None:
+        return None
+
+    entry = read_local(cache, key)
+    if entry is not None and is_valid(cache, entry):
+        os.utime(local_path(cache, key))
+        return entry["auction"]
+
+    if cache["s3_client"] is not None:
+        try:
+            entry = read_s3(cache, key)
+        except Exception as e:
+            print(f"Scrape cache: S3 read failed for {key}: {e}")
+            return None
+        if entry is not None and is_valid(cache, entry):
+            write_local(cache, key, entry)
+            return entry["auction"]
+
+    return None
+
+
+def put_cached(cache:dict, url:str, auction_data:dict):
+    """
+    Caches a scraped auction. Pages that failed to load or loaded only partly (see `is_complete`)
+    are not cached, so the next run scrapes them again instead of keeping the partial parse.
+    """
+    key = auction_id(url)
+    if key is None or not is_complete(auction_data):
+        return
+
+    entry = {
+        "version": CACHE_VERSION,
+        "cached_at": time.time(),
+        "terminal": is_terminal(auction_data),
+        "auction": auction_data,
+    }
+    write_local(cache, key, entry)
+
+    if cache["s3_client"] is not None:
+        try:
+            compression.put_object(
+                cache["s3_client"],
+                cache["bucket"],
+                s3_key(cache, key),
+                json.dumps(entry).encode('utf-8'),
+                'application/json'
+            )
+        except Exception as e:
+            # the cache is an optimization, a failed write must not fail the scrape
+            print(f"Scrape cache: S3 write failed for {key}: {e}")
+
+
+def evict_lru(cache:dict) -> int:
+    """
+    Deletes the least recently used local entries beyond `max_entries`. The S3 tier isn't
+    evicted here: it holds one small object per auction and stale live entries are overwritten
+    on their next scrape.
+
+    Returns:
+        int: Number of entries evicted
+    """
+    entries = []
+    with os.scandir(cache["cache_dir"]) as it:
+        for dir_entry in it:
+            if dir_entry.name.endswith(".json"):
+                entries.append((dir_entry.stat().st_mtime, dir_entry.path))
+
+    excess = len(entries) - cache["max_entries"]
+    if excess <= 0:
+        return 0
+
+    for _, path in sorted(entries)[:excess]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return excess
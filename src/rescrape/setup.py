@@ -6,39 +6,190 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from fake_useragent import UserAgent
+import os
+import re
 import time
+import random
+import shutil
+import subprocess
+import threading
+from functools import lru_cache
 
-ua = UserAgent()
+# chromedriver is resolved once per Chrome version and kept here, so later runs need no driver registry lookup
+CHROMEDRIVER_CACHE_DIR = os.getenv('CHROMEDRIVER_CACHE_DIR', os.path.expanduser('~/.cache/chromedriver'))
+# an explicit driver binary skips resolution altogether
+CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH')
+CHROME_BINARIES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser')
 
+USER_AGENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'user_agents.txt')
 
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
 
-def driver_setup():
+# 'lean' skips images and third-party requests and returns from get() at DOMContentLoaded; 'full' loads everything.
+# 'full' stays the default until runs with LOG_PAGE_LOAD_STATS=true have measured 'lean' against it
+DRIVER_PROFILE = os.getenv('DRIVER_PROFILE', 'full')
+
+# third-party hosts & assets the scraper never reads (analytics, ads, fonts, video embeds);
+# video ids come from the ytimg `src` attribute, which is set whether or not the image loads
+LEAN_BLOCKED_URLS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*facebook.net*",
+    "*facebook.com/tr*",
+    "*hotjar.com*",
+    "*segment.io*",
+    "*segment.com*",
+    "*intercom.io*",
+    "*sentry.io*",
+    "*fonts.googleapis.com*",
+    "*fonts.gstatic.com*",
+    "*youtube.com*",
+    "*ytimg.com*",
+    "*.woff*",
+    "*.ttf",
+    "*.mp4",
+]
+
+# transfer size & timings of the current page, from the Performance API (blocked requests are never transferred)
+PAGE_LOAD_STATS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+const transferred = resources.reduce((total, r) => total + (r.transferSize || 0), nav ? nav.transferSize : 0);
+return {
+    dom_content_loaded_ms: nav ? Math.round(nav.domContentLoadedEventEnd) : null,
+    load_ms: nav ? Math.round(nav.loadEventEnd) : null,
+    requests: resources.length + 1,
+    transferred_kb: Math.round(transferred / 1024),
+};
+"""
+
+
+def chrome_version() -> str | None:
+    """Version of the installed Chrome/Chromium (e.g. '141.0.7390.54'), or None if none is found."""
+    for binary in CHROME_BINARIES:
+        if not shutil.which(binary):
+            continue
+        try:
+            output = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = re.search(r'\d+\.\d+\.\d+\.\d+', output)
+        if match:
+            return match.group(0)
+    return None
+
+
+def chromedriver_path() -> str:
+    """
+    Returns a chromedriver binary matching the installed Chrome, resolving it at most once per process.
+
+    Order: CHROMEDRIVER_PATH, then the copy cached under CHROMEDRIVER_CACHE_DIR/<chrome version>/,
+    then ChromeDriverManager (network), whose result is copied into the cache for the next run.
+    """
+    global _chromedriver_path
+
+    with _chromedriver_lock:
+        if _chromedriver_path:
+            return _chromedriver_path
+
+        if CHROMEDRIVER_PATH:
+            _chromedriver_path = CHROMEDRIVER_PATH
+            return _chromedriver_path
+
+        version = chrome_version()
+        cached_path = os.path.join(CHROMEDRIVER_CACHE_DIR, version, 'chromedriver') if version else None
+        if cached_path and os.access(cached_path, os.X_OK):
+            print(f"Using cached chromedriver for Chrome {version}")
+            _chromedriver_path = cached_path
+            return _chromedriver_path
+
+        print(f"Resolving chromedriver for Chrome {version or '(version unknown)'}...")
+        installed_path = ChromeDriverManager(driver_version=version).install() if version else ChromeDriverManager().install()
+
+        if cached_path:
+            os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+            shutil.copy2(installed_path, cached_path)
+            _chromedriver_path = cached_path
+        else:
+            _chromedriver_path = installed_path
+        return _chromedriver_path
+
+
+@lru_cache(maxsize=1)
+def load_user_agents(path:str = USER_AGENTS_PATH) -> tuple:
+    """Reads the bundled user-agent pool (one per line, # comments ignored)."""
+    try:
+        with open(path, "r") as f:
+            return tuple(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    except FileNotFoundError:
+        print(f"User agent pool not found: {path}")
+        return ()
+
+
+def random_user_agent() -> str:
+    """Random user agent from the bundled pool; fake_useragent is only loaded if the pool is missing."""
+    user_agents = load_user_agents()
+    if user_agents:
+        return random.choice(user_agents)
+
+    from fake_useragent import UserAgent
+    return UserAgent().random
+
+
+def driver_setup(profile:str = DRIVER_PROFILE):
     options = Options()
     options.add_argument("--headless=new") 
     options.add_argument("--disable-gpu")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--window-size=1920,1080")
-    options.add_argument(f"user-agent={ua.random}")  # Use a random user agent
+    options.add_argument(f"user-agent={random_user_agent()}")  # Use a random user agent
+
+    if profile == 'lean':
+        # don't wait for images, iframes & late scripts: every field is waited for explicitly
+        options.page_load_strategy = 'eager'
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
     
     driver = webdriver.Chrome(
-        service=ChromeService(ChromeDriverManager().install()),
+        service=ChromeService(chromedriver_path()),
         options=options
         )
+
+    if profile == 'lean':
+        # block third-party requests before the first page is opened
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+
     return driver
 
 
-def close_promo_bar(driver, timeout=10):
+def page_load_stats(driver) -> dict:
+    """Page-load timings (ms), request count and KB transferred for the page the driver is on."""
     try:
-        # Wait for the close button to be present AND clickable
+        return driver.execute_script(PAGE_LOAD_STATS_SCRIPT)
+    except Exception as e:
+        print(f"Error reading page load stats: {e}")
+        return {}
+
+
+def close_promo_bar(driver, timeout=2):
+    try:
+        # quick non-blocking check: most pages have no promo bar, so don't wait for one to appear
+        if not driver.find_elements(By.CSS_SELECTOR, ".promo-bar.new-seller .rb.close.dismiss"):
+            return
+
+        # the bar is there: wait briefly for the close button to become clickable
         close_button = WebDriverWait(driver, timeout).until(
             EC.element_to_be_clickable((By.CSS_SELECTOR, ".promo-bar.new-seller .rb.close.dismiss"))
         )
         close_button.click()
         print("Promo bar closed successfully.")
     except TimeoutException:
-        print("Promo bar close button not found or not clickable within timeout.")
+        print("Promo bar close button not clickable within timeout.")
     except Exception as e:
         print(f"Error closing promo bar: {e}")
 
@@ -0,0 +1,94 @@
+import os
+import json
+
+import checkpoint
+from auction_transform import compression
+
+
+# objects of a sharded rescrape run, under the run's checkpoint prefix:
+#   {prefix}/shards/manifest.json       shard count & URL object of each shard (written by the split job)
+#   {prefix}/shards/shard-02.txt        URLs of shard 2, one per line
+#   {prefix}/shards/shard-02.result.json  outcome of shard 2's job ({"status": "ok"|"error", ...})
+#   {prefix}/shard-02/scraped/...       micro-batch checkpoints of shard 2 (see checkpoint.py)
+SHARDS_DIR = 'shards'
+MANIFEST_NAME = 'manifest.json'
+
+
+def shard_name(shard_index:int) -> str:
+    return f"shard-{shard_index:02d}"
+
+
+def shard_urls_key(prefix:str, shard_index:int) -> str:
+    return f"{prefix}/{SHARDS_DIR}/{shard_name(shard_index)}.txt"
+
+
+def shard_result_key(prefix:str, shard_index:int) -> str:
+    return f"{prefix}/{SHARDS_DIR}/{shard_name(shard_index)}.result.json"
+
+
+def shard_checkpoint_prefix(prefix:str, shard_index:int) -> str:
+    return f"{prefix}/{shard_name(shard_index)}"
+
+
+def split_urls(urls:list, shard_count:int) -> list:
+    """
+    Splits `urls` into `shard_count` shards (at least one, at most one per URL).
+
+    URLs are dealt round-robin rather than in contiguous chunks, so auctions listed
+    together in the URL file (e.g. the same day) are spread over all shards.
+    """
+    shard_count = max(1, min(shard_count, len(urls)))
+    return [urls[i::shard_count] for i in range(shard_count)]
+
+
+def write_shards(s3_client, bucket:str, prefix:str, urls:list, shard_count:int) -> int:
+    """
+    Writes each shard's URLs and the shard manifest to S3.
+
+    Returns:
+        int: The number of shards written
+    """
+    shards = split_urls(urls, shard_count)
+    for shard_index, shard_urls in enumerate(shards):
+        compression.put_object(
+            s3_client,
+            bucket,
+            shard_urls_key(prefix, shard_index),
+            "\n".join(shard_urls).encode('utf-8'),
+            'text/plain'
+        )
+
+    checkpoint.write_json(s3_client, bucket, f"{prefix}/{SHARDS_DIR}/{MANIFEST_NAME}", {
+        "shard_count": len(shards),
+        "url_count": len(urls),
+    })
+    print(f"Split {len(urls)} URLs into {len(shards)} shards: {[len(shard_urls) for shard_urls in shards]}")
+    return len(shards)
+
+
+def read_shard_count(s3_client, bucket:str, prefix:str) -> int:
+    """Shard count from the manifest, 0 if the split job never wrote one."""
+    try:
+        return checkpoint.read_json(s3_client, bucket, f"{prefix}/{SHARDS_DIR}/{MANIFEST_NAME}")["shard_count"]
+    except s3_client.exceptions.NoSuchKey:
+        return 0
+
+
+def write_shard_result(s3_client, bucket:str, prefix:str, shard_index:int, result:dict):
+    checkpoint.write_json(s3_client, bucket, shard_result_key(prefix, shard_index), result)
+
+
+def read_shard_result(s3_client, bucket:str, prefix:str, shard_index:int) -> dict | None:
+    """A shard job's result, None if the job never finished (crashed, timed out or was cancelled)."""
+    try:
+        return checkpoint.read_json(s3_client, bucket, shard_result_key(prefix, shard_index))
+    except s3_client.exceptions.NoSuchKey:
+        return None
+
+
+def write_github_output(name:str, value):
+    """Sets a step output for later jobs (no-op outside GitHub Actions)."""
+    output_path = os.getenv('GITHUB_OUTPUT')
+    if output_path:
+        with open(output_path, "a") as f:
+            f.write(f"{name}={json.dumps(value)}\n")
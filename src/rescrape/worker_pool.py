@@ -0,0 +1,158 @@
+import os
+import time
+import threading
+import queue
+from collections import defaultdict
+
+import setup
+import scrape_auction
+import http_scrape
+import scrape_cache
+
+
+# drivers are created one at a time so Chrome start-ups don't compete for CPU with running scrapes
+DRIVER_SETUP_LOCK = threading.Lock()
+
+# log page-load time & bytes transferred for each URL (compare DRIVER_PROFILE=lean vs full)
+LOG_PAGE_LOAD_STATS = os.getenv('LOG_PAGE_LOAD_STATS', 'false').lower() == 'true'
+
+# 'auto' fetches each page over plain HTTP first and only opens a browser for pages that are
+# incomplete without JavaScript (see http_scrape.is_complete); 'selenium' always uses the browser
+SCRAPE_BACKEND = os.getenv('SCRAPE_BACKEND', 'auto')
+SCRAPE_BACKENDS = ('auto', 'selenium')
+
+
+def scrape_urls(urls:list, workers:int = 4, pages_per_driver:int = 25, backend:str = SCRAPE_BACKEND, cache:dict = None) -> list:
+    """
+    Scrapes auction pages with a pool of worker threads, each driving its own headless Chrome.
+
+    With backend='auto', workers first fetch the page through a shared, pooled HTTP session and
+    only fall back to their driver (started on first use) when the page is incomplete. The
+    backend that served each URL is logged, with a per-backend summary at the end.
+
+    With a `cache` (see scrape_cache.scrape_cache), URLs with a valid cache entry are served
+    from it without a fetch, and every scraped page is written back to it.
+
+    Workers take URLs from a shared queue, so a slow page only holds up its own worker. Each
+    driver is torn down and replaced after `pages_per_driver` pages to keep Chrome's memory
+    and session state from building up over a long rescrape. If a page raises, the remaining
+    URLs are skipped and the error is re-raised once all workers have stopped.
+
+    Parameters:
+        urls (list): Auction URLs to scrape
+        workers (int): Number of concurrent drivers (capped at the number of URLs)
+        pages_per_driver (int): Pages a driver scrapes before it is recycled
+        backend (str): 'auto' (HTTP first, Selenium fallback) or 'selenium'
+        cache (dict): Optional scrape cache
+
+    Returns:
+        list: Scraped auction dicts, in the same order as `urls`
+    """
+    if backend not in SCRAPE_BACKENDS:
+        raise ValueError(f"Unsupported scrape backend: {backend}. Expected one of {SCRAPE_BACKENDS}")
+
+    results = [None] * len(urls)
+    if not urls:
+        return results
+
+    # backend and seconds spent per URL
+    backends = [None] * len(urls)
+    durations = [0.0] * len(urls)
+    session = http_scrape.http_session(workers) if backend == 'auto' else None
+
+    url_queue = queue.Queue()
+    for i, url in enumerate(urls):
+        auction_data = scrape_cache.get_cached(cache, url) if cache is not None else None
+        if auction_data is not None:
+            results[i], backends[i] = auction_data, 'cache'
+            continue
+        url_queue.put((i, url))
+
+    errors = []
+    stop = threading.Event()
+
+    def worker(worker_id):
+        driver = None
+        pages = 0
+        try:
+            while not stop.is_set():
+                try:
+                    i, url = url_queue.get_nowait()
+                except queue.Empty:
+                    return
+
+                start = time.perf_counter()
+
+                # HTTP fast path
+                if session is not None:
+                    auction_data = http_scrape.scrape_auction_http(session, url)
+                    if auction_data is not None:
+                        results[i], backends[i] = auction_data, 'http'
+                        durations[i] = time.perf_counter() - start
+                        if cache is not None:
+                            scrape_cache.put_cached(cache, url, auction_data)
+                        print(f"[worker {worker_id}] Scraped {url} via http")
+                        continue
+
+                # start a driver, or recycle one that has reached its page limit
+                if driver is None or pages >= pages_per_driver:
+                    if driver:
+                        setup.driver_teardown(driver)
+                        driver = None
+                    with DRIVER_SETUP_LOCK:
+                        print(f"[worker {worker_id}] Setting up the driver...")
+                        driver = setup.driver_setup()
+                    pages = 0
+
+                results[i] = scrape_auction.scrape_auction_data(driver, url)
+                backends[i] = 'selenium'
+                durations[i] = time.perf_counter() - start
+                if cache is not None:
+                    scrape_cache.put_cached(cache, url, results[i])
+                pages += 1
+                if LOG_PAGE_LOAD_STATS:
+                    print(f"[worker {worker_id}] Scraped {url} via selenium {setup.page_load_stats(driver)}")
+                else:
+                    print(f"[worker {worker_id}] Scraped {url} via selenium")
+
+        except Exception as e:
+            print(f"[worker {worker_id}] Error scraping: {e}")
+            errors.append(e)
+            stop.set()
+        finally:
+            if driver:
+                setup.driver_teardown(driver)
+
+    threads = [
+        threading.Thread(target=worker, args=(worker_id,), daemon=True)
+        for worker_id in range(min(workers, url_queue.qsize()))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if session is not None:
+        session.close()
+
+    if errors:
+        raise errors[0]
+
+    if cache is not None:
+        evicted = scrape_cache.evict_lru(cache)
+        if evicted:
+            print(f"Scrape cache: evicted {evicted} least recently used entries")
+
+    print_backend_summary(backends, durations)
+    return results
+
+
+def print_backend_summary(backends:list, durations:list):
+    """Prints how many URLs each backend served and its average seconds per URL."""
+    totals = defaultdict(lambda: [0, 0.0])
+    for backend, duration in zip(backends, durations):
+        totals[backend][0] += 1
+        totals[backend][1] += duration
+
+    for backend, (count, seconds) in sorted(totals.items()):
+        print(f"Scrape backend {backend}: {count} URLs, {seconds / count:.2f}s per URL")
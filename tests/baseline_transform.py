@@ -1,34 +1,13 @@
-import json
-import boto3,botocore
-import pandas as pd
-import numpy as np
+"""
+The transform of the transform Lambda as it was before the shared `auction_transform` package,
+kept verbatim (src/lambdas/transform_lambda/main.py, without its S3 reads/writes and handler).
+test_transform.py checks the golden file and the pipeline against it.
+"""
 import re
 
+import pandas as pd
+import numpy as np
 
-# ============================= Transform ===============================================================================
-def read_json_from_s3(s3_client, bucket: str, key: str) -> dict:
-    """
-    Read a JSON file from S3.
-
-    Args:
-        s3_client : boto3.client
-        bucket (str): Name of the S3 bucket.
-        key (str): Object key (path to file in S3).
-
-    Returns:
-        dict: Parsed JSON data from the file.
-
-    Raises:
-        Exception: If the file cannot be retrieved or parsed.
-    """
-    print(f"Reading file from s3://{bucket}/{key}")
-    try:
-        response = s3_client.get_object(Bucket=bucket, Key=key)
-        content = response['Body'].read().decode('utf-8')
-        return json.loads(content)
-    except Exception as e:
-        print(f"Error reading file from S3: {e}")
-        raise
 
 def convert_to_list_dicts(data) -> list:
     """
@@ -308,90 +287,3 @@ def clean_and_transform(df):
     df['manufacture_year'] = df['auction_url'].apply(extract_manufacture_year)
 
     return df
-
-# ====================================== Load to S3 ======================================================================
-def enforce_column_types(df):
-    # df['auction_date'] = pd.to_datetime(df['auction_date'], errors='coerce')
-    numeric_cols = ['mileage', 'bid_count', 'highest_bid_value', 'manufacture_year', 'max_bid', 'min_bid']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    df['reserve_met'] = df['reserve_met'].astype(bool)
-    return df
-
-def load_to_s3(s3_client, bucket, df)->list:
-    """
-    Uploads a cleaned DataFrame to an S3 bucket in NDJSON format, grouped by auction date.
-
-    This function groups the input DataFrame by the `auction_date` column (date-only),
-    and for each group:
-      - Converts the group as NDJSON.
-      - Checks if a corresponding object (file) already exists in the S3 bucket.
-        - If it exists: reads existing data, appends the new group data, and writes the merged data back to S3.
-        - If it does not exist: uploads the new group data directly.
-    
-    Parameters:
-    -----------
-    s3_client : boto3.client
-        A Boto3 S3 client instance.
-    
-    bucket : str
-        The name of the target S3 bucket.
-
-    df : pandas.DataFrame
-        The cleaned DataFrame containing an 'auction_date' column in datetime format.
-        The function creates a temporary column 'auction_saving_date' (date-only) to group the data.
-    
-    Returns:
-        - a list of uploaded objects keys
-    """
-    uploaded_objects = []
-    
-    def check_object_exists(bucket,object_key):
-        try:
-            response = s3_client.head_object(Bucket=bucket, Key=object_key)
-            return True
-        except botocore.exceptions.ClientError as e:
-            return False
-        
-
-    # group the df by auction_saving_date
-    
-    df['auction_saving_date'] = df['auction_date'].dt.date
-    for auction_day, group in df.groupby('auction_saving_date'):
-        # create object key
-        group_object_key = f'{auction_day}.json'
-
-        ndjson_str = group.to_json(orient='records', lines=True)
-        new_data = [json.loads(line) for line in ndjson_str.splitlines()]
-
-
-        # check if key exists in bucket
-        if check_object_exists(bucket, group_object_key):
-            response = s3_client.get_object(Bucket=bucket, Key=group_object_key)
-            existing_data = [json.loads(line) for line in response['Body'].read().decode('utf-8').splitlines()] # auction data is already in ndjson at this point
-
-            # combine existing and new auction data
-            combined_data = existing_data + new_data
-
-            # create df
-            # sort data by auction_date in desc order
-            # drop duplicates based on auction_id
-            df = pd.DataFrame(combined_data)
-            df = enforce_column_types(df) 
-            df = df.drop(columns=['auction_saving_date']).sort_values('auction_date', ascending=False).reset_index(drop=True)
-            df = df.drop_duplicates('auction_id', keep='first')
-
-
-            # upload updated data back to s3
-            ndjson_str = "\n".join(json.dumps(record) for record in df.to_dict(orient='records'))
-            s3_client.put_object(Bucket=bucket, Key=group_object_key, Body=ndjson_str.encode('utf-8'), ContentType='application/json')
-            uploaded_objects.append(group_object_key)
-
-        else:
-            ndjson_str = "\n".join(json.dumps(record) for record in new_data)
-            s3_client.put_object(Bucket=bucket, Key=group_object_key, Body=ndjson_str, ContentType='application/json')
-            uploaded_objects.append(group_object_key)
-
-    return uploaded_objects
-
-
@@ -0,0 +1,23 @@
+import json
+
+import pytest
+
+from benchmark_transform import GOLDEN_PATH, load_raw_auctions, run_stages
+
+
+@pytest.fixture(scope="session")
+def golden() -> dict:
+    """The expected pipeline output on the fixtures (see `benchmark_transform.py --update-golden`)."""
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def raw_auctions() -> list:
+    return load_raw_auctions()
+
+
+@pytest.fixture(scope="session")
+def stages(raw_auctions) -> dict:
+    """{stage: (seconds, output)} of one pipeline run on the fixtures."""
+    return run_stages(raw_auctions)
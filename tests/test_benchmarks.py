@@ -0,0 +1,67 @@
+"""
+pytest-benchmark timings of the `auction_transform` stages on the fixtures repeated BENCHMARK_COPIES
+times. Compare runs with `pytest tests/test_benchmarks.py --benchmark-autosave` and
+`pytest-benchmark compare`; `--benchmark-skip` leaves them out of a quick test run.
+"""
+import pytest
+
+import auction_transform
+from benchmark_transform import load_raw_auctions
+
+BENCHMARK_COPIES = 100
+
+
+@pytest.fixture(scope="module")
+def raw_auctions() -> list:
+    return load_raw_auctions(BENCHMARK_COPIES)
+
+
+@pytest.fixture(scope="module")
+def columns(raw_auctions) -> dict:
+    return auction_transform.flatten_auctions(raw_auctions)
+
+
+@pytest.fixture(scope="module")
+def auction_df(columns):
+    return auction_transform.create_auction_df(columns)
+
+
+@pytest.fixture(scope="module")
+def valid_df(auction_df):
+    return auction_transform.extract_invalid_auctions(auction_df)[0]
+
+
+@pytest.fixture(scope="module")
+def cleaned_df(valid_df):
+    return auction_transform.clean_and_transform(valid_df.copy())
+
+
+def test_flatten_auctions(benchmark, raw_auctions):
+    columns = benchmark(auction_transform.flatten_auctions, raw_auctions)
+    assert len(columns['auction_url']) == len(raw_auctions)
+
+
+def test_create_auction_df(benchmark, columns):
+    df = benchmark(auction_transform.create_auction_df, columns)
+    assert len(df) == len(columns['auction_url'])
+
+
+def test_extract_invalid_auctions(benchmark, auction_df):
+    valid_df, rescrape_urls = benchmark(auction_transform.extract_invalid_auctions, auction_df)
+    assert len(valid_df) + len(rescrape_urls) == len(auction_df)
+
+
+def test_clean_and_transform(benchmark, valid_df):
+    # clean_and_transform modifies its input, every round gets a fresh copy
+    cleaned_df = benchmark.pedantic(
+        auction_transform.clean_and_transform, setup=lambda: ((valid_df.copy(),), {}), rounds=10
+    )
+    assert len(cleaned_df) == len(valid_df)
+
+
+@pytest.mark.parametrize('file_format', auction_transform.FILE_FORMATS)
+def test_encode_part(benchmark, cleaned_df, file_format):
+    if file_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    body, _ = benchmark(auction_transform.encode_part, cleaned_df, file_format)
+    assert body
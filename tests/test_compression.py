@@ -0,0 +1,59 @@
+"""
+load_lambda and write_rescrape_urls_lambda don't ship src/auction_transform and keep their own copies
+of its compression helpers. Objects written by any of them have to read back the same everywhere.
+"""
+import io
+import os
+import importlib.util
+
+import pytest
+
+from auction_transform import compression
+
+LAMBDAS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambdas')
+BODY = b'{"auction_id":"a","bids":[20000,20750]}\n' * 1000
+
+
+def load_lambda_module(function_name:str):
+    spec = importlib.util.spec_from_file_location(function_name, os.path.join(LAMBDAS_DIR, function_name, 'main.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def load_lambda():
+    return load_lambda_module('load_lambda')
+
+
+@pytest.fixture(scope="module")
+def write_rescrape_urls_lambda():
+    return load_lambda_module('write_rescrape_urls_lambda')
+
+
+def get_object_response(body:bytes, content_encoding:str = None) -> dict:
+    response = {'Body': io.BytesIO(body)}
+    if content_encoding:
+        response['ContentEncoding'] = content_encoding
+    return response
+
+
+@pytest.mark.parametrize("object_compression", compression.COMPRESSIONS)
+def test_write_rescrape_urls_compress(write_rescrape_urls_lambda, monkeypatch, object_compression):
+    monkeypatch.setattr(write_rescrape_urls_lambda, 'OBJECT_COMPRESSION', object_compression)
+    body, content_encoding = compression.compress(BODY, object_compression)
+
+    expected = {'Body': body, 'ContentEncoding': content_encoding} if content_encoding else {'Body': body}
+    assert write_rescrape_urls_lambda.compress(BODY) == expected
+
+
+@pytest.mark.parametrize("object_compression", compression.COMPRESSIONS)
+@pytest.mark.parametrize("with_content_encoding", [True, False], ids=["content-encoding", "magic-bytes"])
+def test_read_body(load_lambda, write_rescrape_urls_lambda, object_compression, with_content_encoding):
+    body, content_encoding = compression.compress(BODY, object_compression)
+    content_encoding = content_encoding if with_content_encoding else None
+
+    for read_body in (compression.read_body, load_lambda.read_body, write_rescrape_urls_lambda.read_body):
+        assert read_body(get_object_response(body, content_encoding)) == BODY
+    assert b''.join(load_lambda.iter_body_lines(get_object_response(body, content_encoding))) == BODY
+
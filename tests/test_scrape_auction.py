@@ -0,0 +1,38 @@
+"""
+Both extraction paths of `scrape_auction_data` on the saved auction pages, opened in headless Chrome:
+the page_source parser ('html') has to build the same dict as the per-element lookups ('webdriver').
+Skipped when no Chrome/chromedriver can be started.
+"""
+import glob
+import os
+import pathlib
+
+import pytest
+
+import setup
+from benchmark_parse import FIXTURES_DIR
+from scrape_auction import scrape_auction_data
+
+FIXTURE_PATHS = sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+# the fixtures have every element the waits look for, or never will
+PAGE_TIMEOUT = 2
+
+
+@pytest.fixture(scope="module")
+def driver():
+    try:
+        driver = setup.driver_setup('full')
+    except Exception as e:
+        pytest.skip(f"Chrome is not available: {e}")
+    yield driver
+    setup.driver_teardown(driver)
+
+
+@pytest.mark.parametrize("path", FIXTURE_PATHS, ids=lambda path: os.path.basename(path))
+def test_html_extraction_matches_webdriver(driver, path):
+    url = pathlib.Path(path).as_uri()
+
+    webdriver_data = scrape_auction_data(driver, url, PAGE_TIMEOUT, extraction='webdriver')
+    html_data = scrape_auction_data(driver, url, PAGE_TIMEOUT, extraction='html')
+
+    assert html_data == webdriver_data